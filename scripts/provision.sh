@@ -17,6 +17,7 @@ TG_CHAT_IDS=""
 ASSUME_YES=false
 VERIFY_API_KEY=true
 PRINT_DETECTED_SSID=false
+NVS_CSV_OUT=""
 WIFI_SSID_MAX_LEN=32
 WIFI_PASS_MAX_LEN=63
 WIFI_PASS_MIN_LEN=8
@@ -39,6 +40,7 @@ Options:
   --yes                     Non-interactive (requires --api-key except ollama; SSID auto-detect if possible)
   --skip-api-check          Skip live API key verification step
   --print-detected-ssid     Print detected host WiFi SSID and exit (test/troubleshooting helper)
+  --write-nvs-csv <path>    Write the NVS CSV to <path> and exit without flashing (test/troubleshooting helper)
   -h, --help                Show help
 EOF
 }
@@ -542,6 +544,30 @@ first_telegram_chat_id() {
     printf '%s\n' "$first"
 }
 
+write_nvs_csv() {
+    local primary_tg_chat_id
+
+    echo "key,type,encoding,value"
+    echo "zclaw,namespace,,"
+    printf "wifi_ssid,data,string,%s\n" "$(csv_escape "$WIFI_SSID")"
+    printf "wifi_pass,data,string,%s\n" "$(csv_escape "$WIFI_PASS")"
+    printf "llm_backend,data,string,%s\n" "$(csv_escape "$BACKEND")"
+    printf "api_key,data,string,%s\n" "$(csv_escape "$API_KEY")"
+    printf "llm_model,data,string,%s\n" "$(csv_escape "$MODEL")"
+    if [ -n "$API_URL" ]; then
+        printf "llm_api_url,data,string,%s\n" "$(csv_escape "$API_URL")"
+    fi
+
+    if [ -n "$TG_TOKEN" ]; then
+        printf "tg_token,data,string,%s\n" "$(csv_escape "$TG_TOKEN")"
+    fi
+    if [ -n "$TG_CHAT_IDS" ]; then
+        primary_tg_chat_id="$(first_telegram_chat_id "$TG_CHAT_IDS")"
+        printf "tg_chat_id,data,string,%s\n" "$(csv_escape "$primary_tg_chat_id")"
+        printf "tg_chat_ids,data,string,%s\n" "$(csv_escape "$TG_CHAT_IDS")"
+    fi
+}
+
 csv_escape() {
     local value="$1"
     value="${value//$'\r'/ }"
@@ -930,6 +956,14 @@ while [ $# -gt 0 ]; do
         --print-detected-ssid)
             PRINT_DETECTED_SSID=true
             ;;
+        --write-nvs-csv)
+            shift
+            [ $# -gt 0 ] || { echo "Error: --write-nvs-csv requires a value"; exit 1; }
+            NVS_CSV_OUT="$1"
+            ;;
+        --write-nvs-csv=*)
+            NVS_CSV_OUT="${1#*=}"
+            ;;
         -h|--help)
             usage
             exit 0
@@ -1175,6 +1209,13 @@ if [ -n "$TG_TOKEN" ] && [ -z "$TG_CHAT_IDS" ]; then
     echo "Warning: Telegram token set without chat ID allowlist; incoming messages will be ignored."
 fi
 
+if [ -n "$NVS_CSV_OUT" ]; then
+    # The CSV holds credentials in plain text; keep it private to the user.
+    (umask 077 && write_nvs_csv > "$NVS_CSV_OUT")
+    echo "Wrote NVS CSV to $NVS_CSV_OUT (nothing flashed)."
+    exit 0
+fi
+
 NVS_GEN="$IDF_PATH/components/nvs_flash/nvs_partition_generator/nvs_partition_gen.py"
 PARTTOOL="$IDF_PATH/components/partition_table/parttool.py"
 
@@ -1192,27 +1233,7 @@ csv_file="$tmpdir/nvs.csv"
 nvs_bin="$tmpdir/nvs.bin"
 trap 'rm -rf "$tmpdir"' EXIT
 
-{
-    echo "key,type,encoding,value"
-    echo "zclaw,namespace,,"
-    printf "wifi_ssid,data,string,%s\n" "$(csv_escape "$WIFI_SSID")"
-    printf "wifi_pass,data,string,%s\n" "$(csv_escape "$WIFI_PASS")"
-    printf "llm_backend,data,string,%s\n" "$(csv_escape "$BACKEND")"
-    printf "api_key,data,string,%s\n" "$(csv_escape "$API_KEY")"
-    printf "llm_model,data,string,%s\n" "$(csv_escape "$MODEL")"
-    if [ -n "$API_URL" ]; then
-        printf "llm_api_url,data,string,%s\n" "$(csv_escape "$API_URL")"
-    fi
-
-    if [ -n "$TG_TOKEN" ]; then
-        printf "tg_token,data,string,%s\n" "$(csv_escape "$TG_TOKEN")"
-    fi
-    if [ -n "$TG_CHAT_IDS" ]; then
-        PRIMARY_TG_CHAT_ID="$(first_telegram_chat_id "$TG_CHAT_IDS")"
-        printf "tg_chat_id,data,string,%s\n" "$(csv_escape "$PRIMARY_TG_CHAT_ID")"
-        printf "tg_chat_ids,data,string,%s\n" "$(csv_escape "$TG_CHAT_IDS")"
-    fi
-} > "$csv_file"
+write_nvs_csv > "$csv_file"
 
 echo "Generating NVS credential image..."
 python "$NVS_GEN" generate "$csv_file" "$nvs_bin" 0x4000
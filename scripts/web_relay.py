@@ -8,11 +8,16 @@ messages to the ESP32 over serial (or to a built-in mock agent).
 from __future__ import annotations
 
 import argparse
+import atexit
 import glob
 import json
 import logging
+import logging.handlers
 import os
 import platform
+import queue
+import signal
+import socket
 import threading
 import time
 from dataclasses import dataclass
@@ -24,7 +29,16 @@ from urllib.parse import urlparse
 
 ESP_LOG_PREFIXES = ("I (", "W (", "E (", "D (", "V (")
 BOOT_LOG_PREFIXES = ("ets ", "rst:", "boot:", "SPIWP:", "mode:", "load:", "entry ")
+DEVICE_LOG_PREFIXES = ESP_LOG_PREFIXES + BOOT_LOG_PREFIXES
 MAX_CHAT_MESSAGE_LEN = 4096
+# Worst case JSON body for a maximum-length message: every character sent as an
+# escaped surrogate pair ("\ud83d\ude00", 12 bytes), plus envelope slack.
+MAX_CHAT_BODY_BYTES = MAX_CHAT_MESSAGE_LEN * 12 + 1024
+SERIAL_RX_CAPACITY = 64 * 1024
+HTTP_SEND_BUFFER_BYTES = 64 * 1024
+LOG_FILE_BUFFER_BYTES = 64 * 1024
+LOG_FLUSH_INTERVAL_S = 30.0
+LOG_FORMAT = "%(asctime)s %(levelname)s %(message)s"
 SERIAL_BUSY_HINTS = (
     "multiple access on port",
     "resource busy",
@@ -150,10 +164,7 @@ def is_request_authorized(provided_key: str | None, expected_key: str | None) ->
 
 
 def is_probable_esp_log_line(line: str) -> bool:
-    stripped = line.strip()
-    if not stripped:
-        return False
-    return stripped.startswith(ESP_LOG_PREFIXES) or stripped.startswith(BOOT_LOG_PREFIXES)
+    return line.lstrip().startswith(DEVICE_LOG_PREFIXES)
 
 
 def is_probable_serial_exception(exc: Exception) -> bool:
@@ -229,8 +240,15 @@ class SerialAgentBridge:
         self.response_timeout_s = response_timeout_s
         self.idle_timeout_s = idle_timeout_s
         self.log_serial = log_serial
+        # Resolved once so the per-line hot path is a single None check.
+        self._log_line = logging.getLogger().info if log_serial else None
         self._serial = None
         self._lock = threading.Lock()
+        # Fixed receive window: lines are consumed by advancing _rx_read and the
+        # tail is only compacted when the next chunk would not fit.
+        self._rxbuf = bytearray(SERIAL_RX_CAPACITY)
+        self._rx_read = 0
+        self._rx_write = 0
 
     def open(self) -> None:
         try:
@@ -288,6 +306,8 @@ class SerialAgentBridge:
         return response
 
     def _drain_input_buffer(self) -> None:
+        self._rx_read = 0
+        self._rx_write = 0
         if self._serial is None:
             return
         try:
@@ -298,14 +318,53 @@ class SerialAgentBridge:
                 if not data:
                     break
 
+    def _rx_append(self, chunk: bytes) -> None:
+        end = self._rx_write + len(chunk)
+        if end > len(self._rxbuf):
+            pending = self._rx_write - self._rx_read
+            self._rxbuf[:pending] = self._rxbuf[self._rx_read:self._rx_write]
+            self._rx_read = 0
+            self._rx_write = pending
+            end = pending + len(chunk)
+            if end > len(self._rxbuf):
+                self._rxbuf.extend(bytes(end - len(self._rxbuf)))
+        self._rxbuf[self._rx_write:end] = chunk
+        self._rx_write = end
+
+    def _rx_take(self, end: int) -> bytes:
+        line = bytes(self._rxbuf[self._rx_read:end])
+        self._rx_read = end
+        if self._rx_read == self._rx_write:
+            self._rx_read = 0
+            self._rx_write = 0
+        return line
+
+    def _readline(self) -> bytes:
+        """Return the next buffered line, reading whatever the port has pending.
+
+        Mirrors pyserial's readline(): a partial line is returned once a read
+        times out with nothing new, and b"" means nothing arrived at all.
+        """
+        if self._serial is None:
+            return b""
+        while True:
+            idx = self._rxbuf.find(b"\n", self._rx_read, self._rx_write)
+            if idx >= 0:
+                return self._rx_take(idx + 1)
+            waiting = getattr(self._serial, "in_waiting", 0) or 1
+            chunk = self._serial.read(waiting)
+            if not chunk:
+                return self._rx_take(self._rx_write)
+            self._rx_append(chunk)
+
     def _write_line(self, line: str) -> None:
         if self._serial is None:
             return
         payload = (line + "\n").encode("utf-8")
         self._serial.write(payload)
         self._serial.flush()
-        if self.log_serial:
-            logging.info("serial>> %s", line)
+        if self._log_line is not None:
+            self._log_line("serial>> %s", line)
 
     def _read_response_lines(self, sent_prompt: str) -> list[str]:
         if self._serial is None:
@@ -317,7 +376,7 @@ class SerialAgentBridge:
         response_lines: list[str] = []
 
         while time.monotonic() < deadline:
-            raw_line = self._serial.readline()
+            raw_line = self._readline()
             now = time.monotonic()
 
             if not raw_line:
@@ -326,8 +385,8 @@ class SerialAgentBridge:
                 continue
 
             line = raw_line.decode("utf-8", errors="replace").strip("\r\n")
-            if self.log_serial:
-                logging.info("serial<< %s", line)
+            if self._log_line is not None:
+                self._log_line("serial<< %s", line)
 
             if not line:
                 if response_lines:
@@ -410,6 +469,20 @@ def create_agent_bridge(args: argparse.Namespace) -> tuple[AgentBridge, str]:
     return bridge, port
 
 
+class RelayHTTPServer(ThreadingHTTPServer):
+    """Threading HTTP server tuned for small request/response exchanges."""
+
+    def process_request(self, request, client_address) -> None:
+        # Headers and body go out as separate writes; without TCP_NODELAY the
+        # body can sit behind Nagle's algorithm waiting for a delayed ACK.
+        try:
+            request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            request.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, HTTP_SEND_BUFFER_BYTES)
+        except OSError:
+            pass
+        super().process_request(request, client_address)
+
+
 def make_handler(state: AppState):
     class RelayHandler(BaseHTTPRequestHandler):
         server_version = "zclaw-web-relay/1.0"
@@ -539,11 +612,20 @@ def make_handler(state: AppState):
                 self._send_json(HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length"})
                 return None
 
-            if length <= 0 or length > 1024 * 1024:
+            if length <= 0 or length > MAX_CHAT_BODY_BYTES:
                 self._send_json(HTTPStatus.BAD_REQUEST, {"error": "Invalid body size"})
                 return None
 
-            raw = self.rfile.read(length)
+            raw = bytearray(length)
+            view = memoryview(raw)
+            received = 0
+            while received < length:
+                count = self.rfile.readinto(view[received:])
+                if not count:
+                    self._send_json(HTTPStatus.BAD_REQUEST, {"error": "Incomplete request body"})
+                    return None
+                received += count
+
             try:
                 payload = json.loads(raw.decode("utf-8"))
             except (UnicodeDecodeError, json.JSONDecodeError):
@@ -1106,7 +1188,7 @@ def run_server(args: argparse.Namespace) -> int:
         cors_origin=cors_origin,
     )
     handler = make_handler(state)
-    httpd = ThreadingHTTPServer((args.host, args.port), handler)
+    httpd = RelayHTTPServer((args.host, args.port), handler)
 
     logging.info(
         "Web relay listening on http://%s:%d (bridge=%s, api_key=%s)",
@@ -1128,21 +1210,93 @@ def run_server(args: argparse.Namespace) -> int:
     return 0
 
 
-def configure_logging(args: argparse.Namespace) -> None:
+class BufferedLogFileHandler(logging.FileHandler):
+    """Log file sink that lets its stdio buffer batch writes.
+
+    StreamHandler flushes after every record; this handler only flushes for
+    ERROR and above so failures still reach disk immediately, plus on a
+    periodic timer that bounds how much a crash can lose.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._flush_stop = threading.Event()
+        self._flush_thread: threading.Thread | None = None
+
+    def start_periodic_flush(self, interval_s: float = LOG_FLUSH_INTERVAL_S) -> None:
+        if self._flush_thread is not None:
+            return
+
+        def flush_loop() -> None:
+            while not self._flush_stop.wait(interval_s):
+                self.flush()
+
+        self._flush_thread = threading.Thread(target=flush_loop, name="log-flush", daemon=True)
+        self._flush_thread.start()
+
+    def _open(self):
+        return open(
+            self.baseFilename,
+            self.mode,
+            buffering=LOG_FILE_BUFFER_BYTES,
+            encoding=self.encoding,
+            errors=self.errors,
+        )
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.ERROR:
+                self.stream.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        self._flush_stop.set()
+        super().close()
+
+
+def configure_logging(
+    args: argparse.Namespace,
+) -> tuple[logging.handlers.QueueHandler, logging.handlers.QueueListener]:
+    """Route log records through a queue so serving threads never block on I/O.
+
+    The caller owns the returned root-logger handler and listener: detach the
+    handler, then stop the listener to flush the sinks.
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
     handlers: list[logging.Handler] = [logging.StreamHandler()]
     if args.log_file:
-        handlers.append(logging.FileHandler(args.log_file, encoding="utf-8"))
+        file_handler = BufferedLogFileHandler(args.log_file, encoding="utf-8")
+        file_handler.start_periodic_flush()
+        atexit.register(file_handler.flush)
+        handlers.append(file_handler)
+    for handler in handlers:
+        handler.setFormatter(formatter)
 
-    logging.basicConfig(
-        level=logging.DEBUG if args.debug else logging.INFO,
-        format="%(asctime)s %(levelname)s %(message)s",
-        handlers=handlers,
-    )
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG if args.debug else logging.INFO)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    root.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return queue_handler, listener
+
+
+def _exit_on_sigterm(signum: int, frame: object) -> None:
+    # Unwind through main()'s finally so buffered log records get flushed, but
+    # keep the shell's signal exit status (143) so supervisors see the SIGTERM.
+    raise SystemExit(128 + signum)
 
 
 def main() -> int:
     args = parse_args()
-    configure_logging(args)
+    queue_handler, listener = configure_logging(args)
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
 
     try:
         return run_server(args)
@@ -1152,6 +1306,13 @@ def main() -> int:
     except Exception as exc:
         logging.error("%s", exc)
         return 1
+    finally:
+        # Detach first: records queued after the listener stops are never
+        # written, e.g. from request threads still finishing or atexit hooks.
+        logging.getLogger().removeHandler(queue_handler)
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
 
 
 if __name__ == "__main__":
@@ -3,17 +3,36 @@
 
 from __future__ import annotations
 
-import copy
+import asyncio
+import atexit
+import functools
+import importlib.util
 import json
 import os
-from dataclasses import dataclass
-from typing import Any
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, NamedTuple
 
 try:
     import httpx
 except ModuleNotFoundError:
     httpx = None
 
+try:
+    import orjson
+except ModuleNotFoundError:
+    orjson = None
+
+try:
+    from jsonschema import Draft202012Validator
+except ModuleNotFoundError:
+    Draft202012Validator = None
+
+# HTTP/2 needs the optional h2 package (pip install 'httpx[http2]').
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
 
 SYSTEM_PROMPT = """You are zclaw, an AI agent running on an ESP32 microcontroller. \
 You have 400KB of RAM and run on bare metal with FreeRTOS. \
@@ -266,6 +285,17 @@ TOOLS = [
     },
 ]
 
+MAX_ROUNDS = 5
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+RETRY_MAX_ATTEMPTS = 4
+RETRY_BASE_DELAY_S = 0.5
+RETRY_MAX_DELAY_S = 30.0
+# Tool results older than the previous round are cut to this many characters so
+# request size grows linearly with rounds rather than carrying every result.
+STALE_TOOL_RESULT_CHARS = 80
+BATCH_POLL_INITIAL_S = 2.0
+BATCH_POLL_MAX_S = 60.0
+
 # Simulated tool results
 MOCK_RESULTS = {
     "gpio_write": lambda inp: f"Pin {inp.get('pin')} -> {'HIGH' if inp.get('state') else 'LOW'}",
@@ -293,6 +323,12 @@ MOCK_RESULTS = {
 }
 
 
+class ToolUse(NamedTuple):
+    id: str
+    name: str
+    input: dict[str, Any]
+
+
 @dataclass(frozen=True)
 class ProviderConfig:
     name: str
@@ -301,6 +337,8 @@ class ProviderConfig:
     model_env: str
     api_key_env: str
     wire_format: str
+    # Sent with every request; resolved once when PROVIDERS is built.
+    extra_headers: tuple[tuple[str, str], ...] = ()
 
 
 PROVIDERS = {
@@ -327,37 +365,78 @@ PROVIDERS = {
         model_env="OPENROUTER_MODEL",
         api_key_env="OPENROUTER_API_KEY",
         wire_format="openai",
+        extra_headers=(
+            ("HTTP-Referer", os.environ.get("OPENROUTER_HTTP_REFERER", "https://github.com/tnm/zclaw")),
+            ("X-Title", os.environ.get("OPENROUTER_X_TITLE", "zclaw api tests")),
+        ),
     ),
 }
 
 
-def _tool_defs_for_provider(provider: ProviderConfig, user_tools: list[dict[str, str]]) -> list[dict[str, Any]]:
-    base = copy.deepcopy(TOOLS)
-    for ut in user_tools:
-        base.append(
-            {
-                "name": ut["name"],
-                "description": ut["description"],
-                "input_schema": {"type": "object", "properties": {}},
-            }
-        )
+# Request pieces that do not change between rounds.
+_ANTHROPIC_HEADERS = {"anthropic-version": "2023-06-01", "content-type": "application/json"}
+# The cache breakpoint on the system block covers everything before it, i.e.
+# the tool definitions and the system prompt, so later rounds read that prefix
+# from Anthropic's prompt cache instead of reprocessing it.
+_ANTHROPIC_PAYLOAD_BASE = {
+    "max_tokens": 1024,
+    "system": [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}],
+}
+_OPENAI_HEADERS = {"content-type": "application/json"}
+_OPENAI_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
 
-    if provider.wire_format == "anthropic":
-        return base
 
-    return [
+def _openai_tool_def(tool: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "type": "function",
+        "function": {
+            "name": tool["name"],
+            "description": tool["description"],
+            "parameters": tool["input_schema"],
+        },
+    }
+
+
+# Built once; the tool definitions are shared read-only across requests.
+_ANTHROPIC_TOOLS_BASE: tuple[dict[str, Any], ...] = tuple(TOOLS)
+_OPENAI_TOOLS_BASE: tuple[dict[str, Any], ...] = tuple(_openai_tool_def(tool) for tool in TOOLS)
+
+
+def _encode_tool_defs(provider: ProviderConfig, user_tools: dict[str, dict[str, str]]) -> bytes:
+    return _json_bytes(_tool_defs_for_provider(provider, user_tools))
+
+
+def _refresh_tool_defs_json(
+    provider: ProviderConfig,
+    user_tools: dict[str, dict[str, str]],
+    cached: tuple[int, bytes] | None,
+) -> tuple[int, bytes]:
+    """Return (len(user_tools), encoded tool array), reusing cached when still current.
+
+    user_tools only ever grows (create_tool adds new names and never replaces
+    one), so an unchanged length means the encoding is still valid.
+    """
+    if cached is not None and cached[0] == len(user_tools):
+        return cached
+    return len(user_tools), _encode_tool_defs(provider, user_tools)
+
+
+def _tool_defs_for_provider(provider: ProviderConfig, user_tools: dict[str, dict[str, str]]) -> list[dict[str, Any]]:
+    extra = [
         {
-            "type": "function",
-            "function": {
-                "name": tool["name"],
-                "description": tool["description"],
-                "parameters": tool["input_schema"],
-            },
+            "name": name,
+            "description": ut["description"],
+            "input_schema": {"type": "object", "properties": {}},
         }
-        for tool in base
+        for name, ut in user_tools.items()
     ]
 
+    if provider.wire_format == "anthropic":
+        return [*_ANTHROPIC_TOOLS_BASE, *extra]
+    return [*_OPENAI_TOOLS_BASE, *(_openai_tool_def(tool) for tool in extra)]
+
 
+@functools.lru_cache(maxsize=32)
 def _openai_like_max_tokens_field(model: str) -> tuple[str, int]:
     # Mirror firmware behavior: GPT-5 chat-completions expects max_completion_tokens.
     if model.lower().startswith("gpt-5"):
@@ -365,104 +444,389 @@ def _openai_like_max_tokens_field(model: str) -> tuple[str, int]:
     return ("max_tokens", 1024)
 
 
+def _json_bytes(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def _json_loads(raw: str | bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _json_text(value: Any) -> str:
+    return _json_bytes(value).decode("utf-8")
+
+
+_shared_client: httpx.Client | None = None
+
+
+def create_client() -> httpx.Client:
+    """Create a pooled httpx client that keeps connections alive across rounds."""
+    if httpx is None:
+        raise RuntimeError("httpx is required for live API tests (pip install httpx)")
+    return httpx.Client(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        timeout=httpx.Timeout(30.0, connect=5.0),
+    )
+
+
+def shared_client() -> httpx.Client:
+    """Return the process-wide client, creating it on first use; it closes at exit."""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = create_client()
+        atexit.register(_shared_client.close)
+    return _shared_client
+
+
+def create_async_client() -> httpx.AsyncClient:
+    """Create a pooled async httpx client for running conversations concurrently."""
+    if httpx is None:
+        raise RuntimeError("httpx is required for live API tests (pip install httpx)")
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        timeout=httpx.Timeout(30.0, connect=5.0),
+    )
+
+
+# Encoded once: the system prompt and tool schema make up most of every request
+# body, so only the per-round fields are serialized when a request is built.
+_ANTHROPIC_BODY_PREFIX = _json_bytes(_ANTHROPIC_PAYLOAD_BASE)[:-1]
+_OPENAI_SYSTEM_MESSAGE_JSON = _json_bytes(_OPENAI_SYSTEM_MESSAGE)
+
+
+def _build_request(
+    provider: ProviderConfig,
+    messages: list[dict[str, Any]],
+    api_key: str,
+    model: str,
+    tools_json: bytes,
+    stream: bool = False,
+) -> tuple[dict[str, str], bytes]:
+    """Return headers and the JSON body, spliced from pre-encoded pieces."""
+    messages_json = _json_bytes(messages)
+    stream_json = b',"stream":true' if stream else b""
+
+    if provider.wire_format == "anthropic":
+        headers = {**_ANTHROPIC_HEADERS, "x-api-key": api_key}
+        headers.update(provider.extra_headers)
+        body = b"".join(
+            (
+                _ANTHROPIC_BODY_PREFIX,
+                b',"model":',
+                _json_bytes(model),
+                b',"tools":',
+                tools_json,
+                b',"messages":',
+                messages_json,
+                stream_json,
+                b"}",
+            )
+        )
+        return headers, body
+
+    headers = {**_OPENAI_HEADERS, "Authorization": f"Bearer {api_key}"}
+    headers.update(provider.extra_headers)
+
+    token_field, token_value = _openai_like_max_tokens_field(model)
+
+    if not messages or messages[0].get("role") != "system":
+        rest = b"," + messages_json[1:] if messages else b"]"
+        messages_json = b"[" + _OPENAI_SYSTEM_MESSAGE_JSON + rest
+
+    body = b"".join(
+        (
+            _json_bytes({"model": model, token_field: token_value})[:-1],
+            b',"messages":',
+            messages_json,
+            b',"tools":',
+            tools_json,
+            stream_json,
+            b"}",
+        )
+    )
+    return headers, body
+
+
+def _retry_delay_s(response: Any, attempt: int) -> float:
+    retry_after = response.headers.get("retry-after")
+    if retry_after:
+        try:
+            return min(RETRY_MAX_DELAY_S, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    delay = RETRY_BASE_DELAY_S * (2**attempt) + random.uniform(0, RETRY_BASE_DELAY_S)
+    return min(RETRY_MAX_DELAY_S, delay)
+
+
+def _post_with_retry(client: httpx.Client, url: str, headers: dict[str, str], body: bytes) -> Any:
+    """POST, retrying rate-limit and transient server errors with backoff."""
+    for attempt in range(RETRY_MAX_ATTEMPTS):
+        response = client.post(url, headers=headers, content=body)
+        if response.status_code not in RETRY_STATUS_CODES or attempt == RETRY_MAX_ATTEMPTS - 1:
+            return response
+        time.sleep(_retry_delay_s(response, attempt))
+    return response
+
+
+async def _apost_with_retry(client: httpx.AsyncClient, url: str, headers: dict[str, str], body: bytes) -> Any:
+    """Async variant of _post_with_retry."""
+    for attempt in range(RETRY_MAX_ATTEMPTS):
+        response = await client.post(url, headers=headers, content=body)
+        if response.status_code not in RETRY_STATUS_CODES or attempt == RETRY_MAX_ATTEMPTS - 1:
+            return response
+        await asyncio.sleep(_retry_delay_s(response, attempt))
+    return response
+
+
 def call_api(
     provider: ProviderConfig,
     messages: list[dict[str, Any]],
     api_key: str,
     model: str,
-    user_tools: list[dict[str, str]],
+    user_tools: dict[str, dict[str, str]],
+    client: httpx.Client | None = None,
+    tools_json: bytes | None = None,
 ) -> dict[str, Any]:
-    """Make API request to provider."""
-    if httpx is None:
-        raise RuntimeError("httpx is required for live API tests (pip install httpx)")
-
-    tools = _tool_defs_for_provider(provider, user_tools)
+    """Make API request to provider.
+
+    tools_json is the pre-encoded tool array for user_tools, when the caller
+    keeps one across rounds.
+    """
+    if client is None:
+        client = shared_client()
+    if tools_json is None:
+        tools_json = _encode_tool_defs(provider, user_tools)
+
+    headers, body = _build_request(provider, messages, api_key, model, tools_json)
+    response = _post_with_retry(client, provider.api_url, headers, body)
+    response.raise_for_status()
+    return _json_loads(response.content)
+
+
+def _iter_sse_data(lines: Any) -> Any:
+    """Yield the decoded JSON payload of each SSE data line until [DONE]."""
+    for line in lines:
+        if not line.startswith("data:"):
+            continue  # event names, keep-alive comments, blank separators
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        if data:
+            yield _json_loads(data)
+
+
+def _accumulate_anthropic_stream(events: Any) -> dict[str, Any]:
+    """Rebuild a non-streaming Messages API response from its SSE events."""
+    response: dict[str, Any] = {"content": [], "stop_reason": None}
+    blocks: dict[int, dict[str, Any]] = {}
+    partial_json: dict[int, list[str]] = {}
+
+    for event in events:
+        event_type = event.get("type")
+        if event_type == "content_block_start":
+            index = event.get("index", len(blocks))
+            blocks[index] = dict(event.get("content_block", {}))
+        elif event_type == "content_block_delta":
+            index = event.get("index", 0)
+            delta = event.get("delta", {})
+            if delta.get("type") == "text_delta":
+                block = blocks.setdefault(index, {"type": "text", "text": ""})
+                block["text"] = block.get("text", "") + delta.get("text", "")
+            elif delta.get("type") == "input_json_delta":
+                partial_json.setdefault(index, []).append(delta.get("partial_json", ""))
+        elif event_type == "content_block_stop":
+            index = event.get("index", 0)
+            if index in partial_json:
+                blocks[index]["input"] = _parse_tool_args("".join(partial_json.pop(index)) or "{}")
+        elif event_type == "message_delta":
+            stop_reason = event.get("delta", {}).get("stop_reason")
+            if stop_reason is not None:
+                response["stop_reason"] = stop_reason
+        elif event_type == "error":
+            raise RuntimeError(f"stream error: {event.get('error')}")
+
+    response["content"] = [blocks[index] for index in sorted(blocks)]
+    return response
+
+
+def _accumulate_openai_stream(chunks: Any) -> dict[str, Any]:
+    """Rebuild a non-streaming chat completion from its SSE chunks."""
+    text_parts: list[str] = []
+    calls: dict[int, dict[str, Any]] = {}
+    finish_reason = None
+
+    for chunk in chunks:
+        choices = chunk.get("choices")
+        if not choices:
+            continue
+        choice0 = choices[0]
+        delta = choice0.get("delta") or {}
+        if delta.get("content"):
+            text_parts.append(delta["content"])
+        for call_delta in delta.get("tool_calls") or ():
+            call = calls.setdefault(
+                call_delta.get("index", len(calls)),
+                {"id": "", "type": "function", "function": {"name": "", "arguments": ""}},
+            )
+            if call_delta.get("id"):
+                call["id"] = call_delta["id"]
+            function_delta = call_delta.get("function") or {}
+            if function_delta.get("name"):
+                call["function"]["name"] += function_delta["name"]
+            if function_delta.get("arguments"):
+                call["function"]["arguments"] += function_delta["arguments"]
+        if choice0.get("finish_reason") is not None:
+            finish_reason = choice0["finish_reason"]
+
+    message: dict[str, Any] = {"role": "assistant", "content": "".join(text_parts) if text_parts else None}
+    if calls:
+        message["tool_calls"] = [calls[index] for index in sorted(calls)]
+    return {"choices": [{"message": message, "finish_reason": finish_reason}]}
+
+
+def stream_api(
+    provider: ProviderConfig,
+    messages: list[dict[str, Any]],
+    api_key: str,
+    model: str,
+    user_tools: dict[str, dict[str, str]],
+    client: httpx.Client | None = None,
+    tools_json: bytes | None = None,
+) -> dict[str, Any]:
+    """Streaming variant of call_api.
+
+    Requests an SSE response and folds it back into the same shape call_api
+    returns, so text and tool calls are consumed as they arrive instead of
+    after one large JSON body.
+    """
+    if client is None:
+        client = shared_client()
+    if tools_json is None:
+        tools_json = _encode_tool_defs(provider, user_tools)
+
+    headers, body = _build_request(provider, messages, api_key, model, tools_json, stream=True)
+    accumulate = (
+        _accumulate_anthropic_stream if provider.wire_format == "anthropic" else _accumulate_openai_stream
+    )
+    attempt = 0
+    while True:
+        with client.stream("POST", provider.api_url, headers=headers, content=body) as response:
+            if response.status_code in RETRY_STATUS_CODES and attempt < RETRY_MAX_ATTEMPTS - 1:
+                delay = _retry_delay_s(response, attempt)
+            else:
+                if response.is_error:
+                    response.read()  # keep the error body available to callers
+                response.raise_for_status()
+                return accumulate(_iter_sse_data(response.iter_lines()))
+        time.sleep(delay)
+        attempt += 1
 
-    if provider.wire_format == "anthropic":
-        headers = {
-            "x-api-key": api_key,
-            "anthropic-version": "2023-06-01",
-            "content-type": "application/json",
-        }
-        payload = {
-            "model": model,
-            "max_tokens": 1024,
-            "system": SYSTEM_PROMPT,
-            "tools": tools,
-            "messages": messages,
-        }
-    else:
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "content-type": "application/json",
-        }
-        if provider.name == "openrouter":
-            headers["HTTP-Referer"] = os.environ.get("OPENROUTER_HTTP_REFERER", "https://github.com/tnm/zclaw")
-            headers["X-Title"] = os.environ.get("OPENROUTER_X_TITLE", "zclaw api tests")
-
-        token_field, token_value = _openai_like_max_tokens_field(model)
-
-        if not messages or messages[0].get("role") != "system":
-            messages = [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                *messages,
-            ]
-
-        payload = {
-            "model": model,
-            token_field: token_value,
-            "messages": messages,
-            "tools": tools,
-        }
 
-    response = httpx.post(provider.api_url, headers=headers, json=payload, timeout=30)
+async def acall_api(
+    provider: ProviderConfig,
+    messages: list[dict[str, Any]],
+    api_key: str,
+    model: str,
+    user_tools: dict[str, dict[str, str]],
+    client: httpx.AsyncClient,
+    tools_json: bytes | None = None,
+) -> dict[str, Any]:
+    """Async variant of call_api."""
+    if tools_json is None:
+        tools_json = _encode_tool_defs(provider, user_tools)
+    headers, body = _build_request(provider, messages, api_key, model, tools_json)
+    response = await _apost_with_retry(client, provider.api_url, headers, body)
     response.raise_for_status()
-    return response.json()
+    return _json_loads(response.content)
+
+
+# Compiled once per built-in tool; building a validator per call re-checks the
+# schema every time.
+_TOOL_VALIDATORS: dict[str, Any] = (
+    {tool["name"]: Draft202012Validator(tool["input_schema"]) for tool in TOOLS}
+    if Draft202012Validator is not None
+    else {}
+)
 
 
-def execute_tool(name: str, input_data: dict[str, Any], user_tools: list[dict[str, str]]) -> str:
+def validate_tool_input(name: str, input_data: dict[str, Any]) -> list[str]:
+    """Return schema violations for a built-in tool call; user tools take no input."""
+    if Draft202012Validator is None:
+        raise RuntimeError("jsonschema is required for tool input validation (pip install jsonschema)")
+    validator = _TOOL_VALIDATORS.get(name)
+    if validator is None:
+        return []
+    return [error.message for error in validator.iter_errors(input_data)]
+
+
+def execute_tool(name: str, input_data: dict[str, Any], user_tools: dict[str, dict[str, str]]) -> str:
     """Simulate tool execution."""
-    for ut in user_tools:
-        if ut["name"] == name:
-            return f"Execute this action now: {ut['action']}"
+    ut = user_tools.get(name)
+    if ut is not None:
+        return f"Execute this action now: {ut['action']}"
 
     if name in MOCK_RESULTS:
         return str(MOCK_RESULTS[name](input_data))
     return f"Unknown tool: {name}"
 
 
-def handle_create_tool(input_data: dict[str, Any], user_tools: list[dict[str, str]]) -> str:
+def handle_create_tool(input_data: dict[str, Any], user_tools: dict[str, dict[str, str]]) -> str:
     """Track user-created tools in-memory for the current session."""
-    user_tools.append(
+    # Like the firmware, an existing tool keeps its original definition.
+    user_tools.setdefault(
+        str(input_data.get("name", "")),
         {
-            "name": str(input_data.get("name", "")),
             "description": str(input_data.get("description", "")),
             "action": str(input_data.get("action", "")),
-        }
+        },
     )
     return str(MOCK_RESULTS["create_tool"](input_data))
 
 
-def _extract_anthropic_round(response: dict[str, Any]) -> tuple[str, list[dict[str, Any]], bool]:
+def _extract_anthropic_round(
+    response: dict[str, Any], want_text: bool = True
+) -> tuple[str, list[ToolUse], bool]:
+    """Split a Messages API response into (text, tool calls, done).
+
+    With want_text=False, text from rounds that continue with tool calls is
+    not collected; a terminal round always returns its text.
+    """
     stop_reason = response.get("stop_reason")
     content = response.get("content", [])
     text_response = ""
-    tool_uses: list[dict[str, Any]] = []
+    tool_uses: list[ToolUse] = []
+
+    if stop_reason == "end_turn":
+        # Terminal turn: any tool_use blocks would be ignored, so skip building them.
+        for block in content:
+            if block.get("type") == "text":
+                text_response = str(block.get("text", ""))
+        return text_response, tool_uses, True
+
+    if not want_text:
+        tool_uses = [
+            ToolUse(str(block.get("id", "")), str(block.get("name", "")), block.get("input", {}))
+            for block in content
+            if block.get("type") == "tool_use"
+        ]
+        if tool_uses:
+            return text_response, tool_uses, False
 
     for block in content:
         if block.get("type") == "text":
             text_response = str(block.get("text", ""))
         elif block.get("type") == "tool_use":
             tool_uses.append(
-                {
-                    "id": str(block.get("id", "")),
-                    "name": str(block.get("name", "")),
-                    "input": block.get("input", {}),
-                }
+                ToolUse(str(block.get("id", "")), str(block.get("name", "")), block.get("input", {}))
             )
 
-    done = stop_reason == "end_turn" or not tool_uses
-    return text_response, tool_uses, done
+    return text_response, tool_uses, not tool_uses
 
 
 def _parse_tool_args(arguments_raw: Any) -> dict[str, Any]:
@@ -471,18 +835,20 @@ def _parse_tool_args(arguments_raw: Any) -> dict[str, Any]:
     if not isinstance(arguments_raw, str):
         return {}
     try:
-        parsed = json.loads(arguments_raw)
-    except json.JSONDecodeError:
+        parsed = _json_loads(arguments_raw)
+    except json.JSONDecodeError:  # orjson.JSONDecodeError subclasses this
         return {}
     if isinstance(parsed, dict):
         return parsed
     return {}
 
 
-def _extract_openai_round(response: dict[str, Any]) -> tuple[str, list[dict[str, Any]], bool, dict[str, Any]]:
-    choices = response.get("choices", [])
+def _extract_openai_round(
+    response: dict[str, Any],
+) -> tuple[str, list[ToolUse], bool, dict[str, Any], str | None]:
+    choices = response.get("choices")
     if not choices:
-        return "", [], True, {"role": "assistant", "content": ""}
+        return "", [], True, {"role": "assistant", "content": ""}, None
 
     choice0 = choices[0]
     message = choice0.get("message", {})
@@ -492,15 +858,15 @@ def _extract_openai_round(response: dict[str, Any]) -> tuple[str, list[dict[str,
     text_response = str(text_response)
 
     raw_tool_calls = message.get("tool_calls", [])
-    tool_uses: list[dict[str, Any]] = []
+    tool_uses: list[ToolUse] = []
     for call in raw_tool_calls:
         function_block = call.get("function", {})
         tool_uses.append(
-            {
-                "id": str(call.get("id", "")),
-                "name": str(function_block.get("name", "")),
-                "input": _parse_tool_args(function_block.get("arguments", "{}")),
-            }
+            ToolUse(
+                str(call.get("id", "")),
+                str(function_block.get("name", "")),
+                _parse_tool_args(function_block.get("arguments", "{}")),
+            )
         )
 
     assistant_msg: dict[str, Any] = {"role": "assistant", "content": message.get("content")}
@@ -508,7 +874,117 @@ def _extract_openai_round(response: dict[str, Any]) -> tuple[str, list[dict[str,
         assistant_msg["tool_calls"] = raw_tool_calls
 
     done = not tool_uses
-    return text_response, tool_uses, done, assistant_msg
+    return text_response, tool_uses, done, assistant_msg, choice0.get("finish_reason")
+
+
+def _summarize_tool_input(input_data: dict[str, Any]) -> str:
+    return f"<{len(input_data)} args>"
+
+
+def _tool_call_lines(tool_uses: list[ToolUse], results: list[str]) -> list[str]:
+    # Rendering full tool inputs only pays off for a human watching a terminal.
+    render_input = _json_text if sys.stdout.isatty() else _summarize_tool_input
+    lines: list[str] = []
+    for tool_use, result in zip(tool_uses, results):
+        lines.append(f"TOOL CALL: {tool_use.name}({render_input(tool_use.input)})")
+        lines.append(f"TOOL RESULT: {result}")
+    return lines
+
+
+def _execute_tool_uses(tool_uses: list[ToolUse], user_tools: dict[str, dict[str, str]]) -> list[str]:
+    """Run one round of tool calls in call order, like the firmware, and return their results."""
+    return [
+        handle_create_tool(tool_use.input, user_tools)
+        if tool_use.name == "create_tool"
+        else execute_tool(tool_use.name, tool_use.input, user_tools)
+        for tool_use in tool_uses
+    ]
+
+
+def _print_conversation_header(provider: ProviderConfig, model: str, user_message: str) -> None:
+    print(f"\n{'='*60}")
+    print(f"PROVIDER: {provider.name}")
+    print(f"MODEL: {model}")
+    print(f"USER: {user_message}")
+    print("=" * 60)
+
+
+def _truncate_tool_result(content: Any) -> Any:
+    if not isinstance(content, str) or len(content) <= STALE_TOOL_RESULT_CHARS:
+        return content
+    return content.split("\n", 1)[0][:STALE_TOOL_RESULT_CHARS] + "... (truncated)"
+
+
+def _truncate_stale_tool_results(messages: list[dict[str, Any]]) -> None:
+    """Shorten tool results from before the latest assistant turn, in place."""
+    for boundary in range(len(messages) - 1, -1, -1):
+        if messages[boundary].get("role") == "assistant":
+            break
+    else:
+        return
+
+    for message in messages[:boundary]:
+        if message.get("role") == "tool":
+            message["content"] = _truncate_tool_result(message.get("content"))
+        elif message.get("role") == "user" and isinstance(message.get("content"), list):
+            for block in message["content"]:
+                if block.get("type") == "tool_result":
+                    block["content"] = _truncate_tool_result(block.get("content"))
+
+
+def _apply_round(
+    provider: ProviderConfig,
+    response: dict[str, Any],
+    messages: list[dict[str, Any]],
+    user_tools: dict[str, dict[str, str]],
+    round_num: int,
+    verbose: bool,
+) -> str | None:
+    """Fold one provider response into messages; return the final text when done.
+
+    Verbose output for the round is collected and written with a single print.
+    """
+    if provider.wire_format == "anthropic":
+        text_response, tool_uses, done = _extract_anthropic_round(response, want_text=verbose)
+        assistant_msg = {"role": "assistant", "content": response.get("content", [])}
+        stop_reason = response.get("stop_reason")
+    else:
+        text_response, tool_uses, done, assistant_msg, stop_reason = _extract_openai_round(response)
+
+    lines: list[str] = []
+    if verbose:
+        cache_read = response.get("usage", {}).get("cache_read_input_tokens")
+        cache_note = f", cache_read_input_tokens: {cache_read}" if cache_read is not None else ""
+        lines.append(f"\n--- Round {round_num + 1} (stop_reason: {stop_reason}{cache_note}) ---")
+        if text_response:
+            lines.append(f"TEXT: {text_response}")
+
+    if done:
+        if verbose:
+            lines.extend((f"\n{'='*60}", f"FINAL: {text_response}", "=" * 60))
+            print("\n".join(lines))
+        return text_response
+
+    # Keep the previous round intact so the model can chain on it.
+    _truncate_stale_tool_results(messages)
+    messages.append(assistant_msg)
+
+    results = _execute_tool_uses(tool_uses, user_tools)
+    if verbose:
+        lines.extend(_tool_call_lines(tool_uses, results))
+        print("\n".join(lines))
+    if provider.wire_format == "anthropic":
+        tool_results = [
+            {"type": "tool_result", "tool_use_id": tool_use.id, "content": result}
+            for tool_use, result in zip(tool_uses, results)
+        ]
+        messages.append({"role": "user", "content": tool_results})
+    else:
+        messages.extend(
+            {"role": "tool", "tool_call_id": tool_use.id, "content": result}
+            for tool_use, result in zip(tool_uses, results)
+        )
+    return None
 
 
 def run_conversation(
@@ -516,90 +992,215 @@ def run_conversation(
     user_message: str,
     api_key: str,
     model: str,
-    user_tools: list[dict[str, str]],
+    user_tools: dict[str, dict[str, str]],
     verbose: bool = True,
+    client: httpx.Client | None = None,
+    stream: bool = False,
 ) -> str:
     """Run a full conversation with tool calling."""
     messages: list[dict[str, Any]] = [{"role": "user", "content": user_message}]
+    fetch = stream_api if stream else call_api
 
     if verbose:
-        print(f"\n{'='*60}")
-        print(f"PROVIDER: {provider.name}")
-        print(f"MODEL: {model}")
-        print(f"USER: {user_message}")
-        print("=" * 60)
-
-    max_rounds = 5
-    for round_num in range(max_rounds):
-        response = call_api(provider, messages, api_key, model, user_tools)
-
-        if provider.wire_format == "anthropic":
-            text_response, tool_uses, done = _extract_anthropic_round(response)
-            assistant_msg = {"role": "assistant", "content": response.get("content", [])}
-            stop_reason = response.get("stop_reason")
-        else:
-            text_response, tool_uses, done, assistant_msg = _extract_openai_round(response)
-            stop_reason = response.get("choices", [{}])[0].get("finish_reason")
+        _print_conversation_header(provider, model, user_message)
 
-        if verbose:
-            print(f"\n--- Round {round_num + 1} (stop_reason: {stop_reason}) ---")
-            if text_response:
-                print(f"TEXT: {text_response}")
-
-        if done:
-            if verbose:
-                print(f"\n{'='*60}")
-                print(f"FINAL: {text_response}")
-                print("=" * 60)
-            return text_response
-
-        messages.append(assistant_msg)
-
-        if provider.wire_format == "anthropic":
-            tool_results = []
-            for tool_use in tool_uses:
-                tool_name = tool_use["name"]
-                tool_id = tool_use["id"]
-                tool_input = tool_use["input"]
-
-                if verbose:
-                    print(f"TOOL CALL: {tool_name}({json.dumps(tool_input)})")
-
-                if tool_name == "create_tool":
-                    result = handle_create_tool(tool_input, user_tools)
-                else:
-                    result = execute_tool(tool_name, tool_input, user_tools)
-
-                if verbose:
-                    print(f"TOOL RESULT: {result}")
-
-                tool_results.append({"type": "tool_result", "tool_use_id": tool_id, "content": result})
-            messages.append({"role": "user", "content": tool_results})
-        else:
-            for tool_use in tool_uses:
-                tool_name = tool_use["name"]
-                tool_id = tool_use["id"]
-                tool_input = tool_use["input"]
-
-                if verbose:
-                    print(f"TOOL CALL: {tool_name}({json.dumps(tool_input)})")
-
-                if tool_name == "create_tool":
-                    result = handle_create_tool(tool_input, user_tools)
-                else:
-                    result = execute_tool(tool_name, tool_input, user_tools)
-
-                if verbose:
-                    print(f"TOOL RESULT: {result}")
-
-                messages.append({"role": "tool", "tool_call_id": tool_id, "content": result})
+    tool_defs: tuple[int, bytes] | None = None
+    for round_num in range(MAX_ROUNDS):
+        tool_defs = _refresh_tool_defs_json(provider, user_tools, tool_defs)
+        response = fetch(provider, messages, api_key, model, user_tools, client=client, tools_json=tool_defs[1])
+        final = _apply_round(provider, response, messages, user_tools, round_num, verbose)
+        if final is not None:
+            return final
 
     return "(Max rounds reached)"
 
 
+async def arun_conversation(
+    provider: ProviderConfig,
+    user_message: str,
+    api_key: str,
+    model: str,
+    user_tools: dict[str, dict[str, str]],
+    client: httpx.AsyncClient,
+    verbose: bool = False,
+) -> str:
+    """Async variant of run_conversation."""
+    messages: list[dict[str, Any]] = [{"role": "user", "content": user_message}]
+
+    if verbose:
+        _print_conversation_header(provider, model, user_message)
+
+    tool_defs: tuple[int, bytes] | None = None
+    for round_num in range(MAX_ROUNDS):
+        tool_defs = _refresh_tool_defs_json(provider, user_tools, tool_defs)
+        response = await acall_api(provider, messages, api_key, model, user_tools, client, tools_json=tool_defs[1])
+        final = _apply_round(provider, response, messages, user_tools, round_num, verbose)
+        if final is not None:
+            return final
+
+    return "(Max rounds reached)"
+
+
+async def arun_conversations(
+    provider: ProviderConfig,
+    user_messages: list[str],
+    api_key: str,
+    model: str,
+    concurrency: int = 4,
+    client: httpx.AsyncClient | None = None,
+) -> list[str]:
+    """Run independent conversations concurrently, each with its own user tools.
+
+    Results are returned in the order of user_messages.
+    """
+    gate = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(user_message: str, active_client: httpx.AsyncClient) -> str:
+        async with gate:
+            return await arun_conversation(provider, user_message, api_key, model, {}, active_client)
+
+    if client is not None:
+        return list(await asyncio.gather(*(run_one(msg, client) for msg in user_messages)))
+    async with create_async_client() as owned_client:
+        return list(await asyncio.gather(*(run_one(msg, owned_client) for msg in user_messages)))
+
+
+async def _arun_anthropic_batch(
+    client: httpx.AsyncClient,
+    provider: ProviderConfig,
+    headers: dict[str, str],
+    bodies: dict[str, bytes],
+) -> dict[str, dict[str, Any]]:
+    """Submit one Message Batch, wait for it to end, and return messages by custom_id.
+
+    Requests that did not succeed are left out of the result.
+    """
+    batch_url = f"{provider.api_url}/batches"
+    requests_json = b",".join(
+        b'{"custom_id":' + _json_bytes(custom_id) + b',"params":' + body + b"}"
+        for custom_id, body in bodies.items()
+    )
+    response = await _apost_with_retry(client, batch_url, headers, b'{"requests":[' + requests_json + b"]}")
+    response.raise_for_status()
+    batch = _json_loads(response.content)
+
+    delay = BATCH_POLL_INITIAL_S
+    while batch.get("processing_status") != "ended":
+        await asyncio.sleep(delay)
+        delay = min(BATCH_POLL_MAX_S, delay * 2)
+        response = await client.get(f"{batch_url}/{batch['id']}", headers=headers)
+        response.raise_for_status()
+        batch = _json_loads(response.content)
+
+    response = await client.get(batch["results_url"], headers=headers)
+    response.raise_for_status()
+    messages: dict[str, dict[str, Any]] = {}
+    for line in response.content.splitlines():
+        if not line:
+            continue
+        record = _json_loads(line)
+        result = record.get("result", {})
+        if result.get("type") == "succeeded":
+            messages[record["custom_id"]] = result["message"]
+    return messages
+
+
+async def arun_conversations_batched(
+    provider: ProviderConfig,
+    user_messages: list[str],
+    api_key: str,
+    model: str,
+    client: httpx.AsyncClient | None = None,
+) -> list[str]:
+    """Run independent conversations through the Anthropic Message Batches API.
+
+    Every round of all unfinished conversations goes out as one batch, which
+    trades latency for throughput on large sweeps. Other providers, and single
+    conversations, fall back to arun_conversations.
+    """
+    if provider.wire_format != "anthropic" or len(user_messages) < 2:
+        return await arun_conversations(provider, user_messages, api_key, model, client=client)
+    if client is None:
+        async with create_async_client() as owned_client:
+            return await arun_conversations_batched(provider, user_messages, api_key, model, owned_client)
+
+    conversations: list[list[dict[str, Any]]] = [[{"role": "user", "content": msg}] for msg in user_messages]
+    tool_sets: list[dict[str, dict[str, str]]] = [{} for _ in user_messages]
+    tool_defs: list[tuple[int, bytes] | None] = [None] * len(user_messages)
+    finals: list[str | None] = [None] * len(user_messages)
+
+    for round_num in range(MAX_ROUNDS):
+        pending = [index for index, final in enumerate(finals) if final is None]
+        if not pending:
+            break
+        bodies: dict[str, bytes] = {}
+        for index in pending:
+            tool_defs[index] = _refresh_tool_defs_json(provider, tool_sets[index], tool_defs[index])
+            headers, bodies[f"case-{index}"] = _build_request(
+                provider, conversations[index], api_key, model, tool_defs[index][1]
+            )
+        responses = await _arun_anthropic_batch(client, provider, headers, bodies)
+        for index in pending:
+            response = responses.get(f"case-{index}")
+            if response is None:
+                finals[index] = "(Batch request failed)"
+                continue
+            finals[index] = _apply_round(
+                provider, response, conversations[index], tool_sets[index], round_num, verbose=False
+            )
+
+    return [final if final is not None else "(Max rounds reached)" for final in finals]
+
+
+@dataclass
+class Session:
+    """Provider, credentials, client and user tools shared by every turn of a REPL."""
+
+    provider: ProviderConfig
+    api_key: str
+    model: str
+    client: httpx.Client
+    user_tools: dict[str, dict[str, str]] = field(default_factory=dict)
+
+    def send(self, user_message: str, verbose: bool = True) -> str:
+        return run_conversation(
+            self.provider,
+            user_message,
+            self.api_key,
+            self.model,
+            self.user_tools,
+            verbose=verbose,
+            client=self.client,
+        )
+
+
+_BUILTIN_TOOL_LINES = "\n".join(f"  {tool['name']}: {tool['description']}" for tool in TOOLS)
+
+
+def _print_builtin_tools(user_tools: dict[str, dict[str, str]]) -> None:
+    print(f"\nBuilt-in tools:\n{_BUILTIN_TOOL_LINES}\n")
+
+
+def _print_user_tools(user_tools: dict[str, dict[str, str]]) -> None:
+    if user_tools:
+        print("\nUser tools:")
+        for name, ut in user_tools.items():
+            print(f"  {name}: {ut['description']}")
+            print(f"    Action: {ut['action']}")
+    else:
+        print("\nNo user tools created yet.")
+    print()
+
+
+_INTERACTIVE_COMMANDS = {
+    "tools": _print_builtin_tools,
+    "user_tools": _print_user_tools,
+}
+
+
 def interactive_mode(provider: ProviderConfig, api_key: str, model: str) -> None:
     """Interactive REPL mode."""
-    user_tools: list[dict[str, str]] = []
+    session = Session(provider, api_key, model, shared_client())
 
     print("\nzclaw API Test Harness")
     print(f"Provider: {provider.name}")
@@ -618,27 +1219,16 @@ def interactive_mode(provider: ProviderConfig, api_key: str, model: str) -> None
 
         if not user_input:
             continue
-        if user_input.lower() == "quit":
+        command = user_input.lower()
+        if command == "quit":
             break
-        if user_input.lower() == "tools":
-            print("\nBuilt-in tools:")
-            for tool in TOOLS:
-                print(f"  {tool['name']}: {tool['description']}")
-            print()
-            continue
-        if user_input.lower() == "user_tools":
-            if user_tools:
-                print("\nUser tools:")
-                for ut in user_tools:
-                    print(f"  {ut['name']}: {ut['description']}")
-                    print(f"    Action: {ut['action']}")
-            else:
-                print("\nNo user tools created yet.")
-            print()
+        show = _INTERACTIVE_COMMANDS.get(command)
+        if show is not None:
+            show(session.user_tools)
             continue
 
         try:
-            run_conversation(provider, user_input, api_key, model, user_tools)
+            session.send(user_input)
         except httpx.HTTPStatusError as err:
             print(f"API Error: {err.response.status_code} - {err.response.text}")
         except Exception as err:
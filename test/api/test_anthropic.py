@@ -14,6 +14,7 @@ def main() -> None:
     parser.add_argument("message", nargs="?", help="Message to send")
     parser.add_argument("--interactive", "-i", action="store_true", help="Interactive mode")
     parser.add_argument("--quiet", "-q", action="store_true", help="Only show final response")
+    parser.add_argument("--stream", action="store_true", help="Stream responses over SSE")
     parser.add_argument(
         "--model",
         "-m",
@@ -31,7 +32,15 @@ def main() -> None:
     if args.interactive:
         interactive_mode(provider, api_key, model)
     elif args.message:
-        run_conversation(provider, args.message, api_key, model, user_tools=[], verbose=not args.quiet)
+        run_conversation(
+            provider,
+            args.message,
+            api_key,
+            model,
+            user_tools={},
+            verbose=not args.quiet,
+            stream=args.stream,
+        )
     else:
         parser.print_help()
 
@@ -9,83 +9,76 @@ Usage:
     export ANTHROPIC_API_KEY=sk-ant-...
     python test_tool_creation.py
     python test_tool_creation.py -v  # verbose
+    python test_tool_creation.py --no-cache  # always hit the API
+
+Responses are cached on disk by request body hash, so reruns with an unchanged
+prompt, tool set and model skip the network.
 """
 
 import os
 import sys
 import json
+import atexit
+import asyncio
+import hashlib
 import argparse
-import httpx
+from pathlib import Path
+
+from provider_harness import (
+    SYSTEM_PROMPT,
+    TOOLS as HARNESS_TOOLS,
+    Draft202012Validator,
+    _apost_with_retry,
+    _json_loads,
+    _json_text,
+    create_async_client,
+    validate_tool_input,
+)
 
 API_URL = "https://api.anthropic.com/v1/messages"
 MODEL = os.environ.get("ANTHROPIC_MODEL", "claude-sonnet-4-6")
 
-SYSTEM_PROMPT = """You are zclaw, an AI agent running on an ESP32 microcontroller. \
-You have 400KB of RAM and run on bare metal with FreeRTOS. \
-You can control GPIO pins, store persistent memories, and set schedules. \
-Be concise - you're on a tiny chip. \
-Use your tools to control hardware, remember things, and automate tasks. \
-Users can create custom tools with create_tool. When you call a custom tool, \
-you'll receive an action to execute - carry it out using your built-in tools."""
-
-# Only include create_tool for these tests
-TOOLS = [
-    {
-        "name": "create_tool",
-        "description": "Create a custom tool. Provide a short name (no spaces), brief description, and the action to perform when called.",
-        "input_schema": {
-            "type": "object",
-            "properties": {
-                "name": {"type": "string", "description": "Tool name (alphanumeric, no spaces)"},
-                "description": {"type": "string", "description": "Short description for tool list"},
-                "action": {"type": "string", "description": "What to do when tool is called"}
-            },
-            "required": ["name", "description", "action"]
-        }
-    },
-    {
-        "name": "gpio_write",
-        "description": "Set a GPIO pin HIGH or LOW.",
-        "input_schema": {
-            "type": "object",
-            "properties": {
-                "pin": {"type": "integer"},
-                "state": {"type": "integer"}
-            },
-            "required": ["pin", "state"]
-        }
-    },
-    {
-        "name": "delay",
-        "description": "Wait for specified milliseconds (max 60000).",
-        "input_schema": {
-            "type": "object",
-            "properties": {
-                "milliseconds": {"type": "integer"}
-            },
-            "required": ["milliseconds"]
-        }
-    },
-    {
-        "name": "cron_set",
-        "description": "Create a scheduled task.",
-        "input_schema": {
-            "type": "object",
-            "properties": {
-                "type": {"type": "string", "enum": ["periodic", "daily", "once"]},
-                "interval_minutes": {"type": "integer"},
-                "delay_minutes": {"type": "integer"},
-                "hour": {"type": "integer"},
-                "minute": {"type": "integer"},
-                "action": {"type": "string"}
-            },
-            "required": ["type", "action"]
-        }
-    },
-]
-
-
-def call_api(message):
+# Only include create_tool and the built-ins its actions usually lean on. The
+# definitions come from the harness so both suites send the same schemas.
+TOOL_NAMES = ("create_tool", "gpio_write", "delay", "cron_set")
+_HARNESS_TOOLS_BY_NAME = {tool["name"]: tool for tool in HARNESS_TOOLS}
+TOOLS = [_HARNESS_TOOLS_BY_NAME[name] for name in TOOL_NAMES]
+
+CACHE_PATH = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "zclaw_test" / "responses.json"
+
+# Request-hash -> response body; None when caching is disabled.
+_response_cache = None
+
+
+def enable_response_cache(path=CACHE_PATH):
+    """Load cached responses from path and write them back at exit."""
+    global _response_cache
+    try:
+        _response_cache = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        _response_cache = {}
+
+    def save():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(_response_cache), encoding="utf-8")
+
+    atexit.register(save)
+
+
+# Everything but the messages is fixed for the run, so it is encoded once and
+# each request only serializes its prompt.
+_PAYLOAD_PREFIX = json.dumps(
+    {"model": MODEL, "max_tokens": 1024, "system": SYSTEM_PROMPT, "tools": TOOLS},
+    separators=(",", ":"),
+).encode("utf-8")[:-1]
+
+
+def build_request_body(message):
+    messages = json.dumps([{"role": "user", "content": message}], separators=(",", ":"))
+    return _PAYLOAD_PREFIX + b',"messages":' + messages.encode("utf-8") + b"}"
+
+
+async def call_api(client, message):
     """Make single-turn API request."""
     api_key = os.environ.get("ANTHROPIC_API_KEY")
     if not api_key:
@@ -97,25 +90,30 @@ def call_api(message):
         "content-type": "application/json",
     }
 
-    payload = {
-        "model": MODEL,
-        "max_tokens": 1024,
-        "system": SYSTEM_PROMPT,
-        "tools": TOOLS,
-        "messages": [{"role": "user", "content": message}],
-    }
+    body = build_request_body(message)
+    key = hashlib.sha256(body).hexdigest()
+    if _response_cache is not None and key in _response_cache:
+        return _response_cache[key]
 
-    response = httpx.post(API_URL, headers=headers, json=payload, timeout=30)
+    # The tests run concurrently on one client, so back off on 429/5xx.
+    response = await _apost_with_retry(client, API_URL, headers, body)
     response.raise_for_status()
-    return response.json()
+    result = _json_loads(response.content)
+    if _response_cache is not None:
+        _response_cache[key] = result
+    return result
 
 
 def extract_tool_call(response):
-    """Extract tool call from response."""
-    for block in response.get("content", []):
-        if block.get("type") == "tool_use" and block.get("name") == "create_tool":
-            return block.get("input", {})
-    return None
+    """Extract the first create_tool call's input from response."""
+    return next(
+        (
+            block.get("input", {})
+            for block in response.get("content", [])
+            if block.get("type") == "tool_use" and block.get("name") == "create_tool"
+        ),
+        None,
+    )
 
 
 class TestResult:
@@ -126,19 +124,29 @@ class TestResult:
         self.details = details
 
 
-def test_simple_gpio_tool(verbose=False):
+def check_create_tool_call(name, tool_call):
+    """Return a failing TestResult if the create_tool call is missing or off-schema, else None."""
+    if not tool_call:
+        return TestResult(name, False, "No create_tool call found")
+    if Draft202012Validator is None:
+        return None  # main() already said schema validation is skipped
+    schema_errors = validate_tool_input("create_tool", tool_call)
+    if schema_errors:
+        return TestResult(name, False, "; ".join(schema_errors), tool_call)
+    return None
+
+
+async def test_simple_gpio_tool(client):
     """Test: Create a tool to turn on an LED"""
     prompt = "Create a tool to turn on the LED on GPIO 2"
 
     try:
-        response = call_api(prompt)
+        response = await call_api(client, prompt)
         tool_call = extract_tool_call(response)
 
-        if verbose:
-            print(f"  Response: {json.dumps(tool_call, indent=2)}")
-
-        if not tool_call:
-            return TestResult("simple_gpio_tool", False, "No create_tool call found")
+        failure = check_create_tool_call("simple_gpio_tool", tool_call)
+        if failure:
+            return failure
 
         # Check required fields
         name = tool_call.get("name", "")
@@ -164,19 +172,17 @@ def test_simple_gpio_tool(verbose=False):
         return TestResult("simple_gpio_tool", False, str(e))
 
 
-def test_complex_sequence_tool(verbose=False):
+async def test_complex_sequence_tool(client):
     """Test: Create a tool with multiple steps"""
     prompt = "Create a tool called water_plants that turns GPIO 5 on, waits 30 seconds, then turns it off"
 
     try:
-        response = call_api(prompt)
+        response = await call_api(client, prompt)
         tool_call = extract_tool_call(response)
 
-        if verbose:
-            print(f"  Response: {json.dumps(tool_call, indent=2)}")
-
-        if not tool_call:
-            return TestResult("complex_sequence_tool", False, "No create_tool call found")
+        failure = check_create_tool_call("complex_sequence_tool", tool_call)
+        if failure:
+            return failure
 
         name = tool_call.get("name", "")
         action = tool_call.get("action", "")
@@ -203,19 +209,17 @@ def test_complex_sequence_tool(verbose=False):
         return TestResult("complex_sequence_tool", False, str(e))
 
 
-def test_scheduled_action_tool(verbose=False):
+async def test_scheduled_action_tool(client):
     """Test: Create a tool involving scheduling"""
     prompt = "Create a tool to remind me every hour to drink water"
 
     try:
-        response = call_api(prompt)
+        response = await call_api(client, prompt)
         tool_call = extract_tool_call(response)
 
-        if verbose:
-            print(f"  Response: {json.dumps(tool_call, indent=2)}")
-
-        if not tool_call:
-            return TestResult("scheduled_action_tool", False, "No create_tool call found")
+        failure = check_create_tool_call("scheduled_action_tool", tool_call)
+        if failure:
+            return failure
 
         name = tool_call.get("name", "")
         action = tool_call.get("action", "")
@@ -240,19 +244,17 @@ def test_scheduled_action_tool(verbose=False):
         return TestResult("scheduled_action_tool", False, str(e))
 
 
-def test_descriptive_name_generation(verbose=False):
+async def test_descriptive_name_generation(client):
     """Test: Claude generates good tool names from description"""
     prompt = "Create a tool that checks the temperature sensor and stores it in memory"
 
     try:
-        response = call_api(prompt)
+        response = await call_api(client, prompt)
         tool_call = extract_tool_call(response)
 
-        if verbose:
-            print(f"  Response: {json.dumps(tool_call, indent=2)}")
-
-        if not tool_call:
-            return TestResult("descriptive_name", False, "No create_tool call found")
+        failure = check_create_tool_call("descriptive_name", tool_call)
+        if failure:
+            return failure
 
         name = tool_call.get("name", "")
         desc = tool_call.get("description", "")
@@ -278,19 +280,17 @@ def test_descriptive_name_generation(verbose=False):
         return TestResult("descriptive_name", False, str(e))
 
 
-def test_action_is_executable(verbose=False):
+async def test_action_is_executable(client):
     """Test: Action should describe steps Claude can execute"""
     prompt = "Create a tool to blink GPIO 3 three times"
 
     try:
-        response = call_api(prompt)
+        response = await call_api(client, prompt)
         tool_call = extract_tool_call(response)
 
-        if verbose:
-            print(f"  Response: {json.dumps(tool_call, indent=2)}")
-
-        if not tool_call:
-            return TestResult("executable_action", False, "No create_tool call found")
+        failure = check_create_tool_call("executable_action", tool_call)
+        if failure:
+            return failure
 
         action = tool_call.get("action", "")
 
@@ -315,8 +315,8 @@ def test_action_is_executable(verbose=False):
         return TestResult("executable_action", False, str(e))
 
 
-def run_tests(verbose=False):
-    """Run all tests."""
+async def run_tests(verbose=False):
+    """Run all tests concurrently; results are reported in declaration order."""
     tests = [
         ("Simple GPIO tool", test_simple_gpio_tool),
         ("Complex sequence tool", test_complex_sequence_tool),
@@ -328,13 +328,14 @@ def run_tests(verbose=False):
     print(f"\nzclaw Tool Creation Tests (model: {MODEL})")
     print("=" * 60)
 
+    async with create_async_client() as client:
+        results = await asyncio.gather(*(test_func(client) for _, test_func in tests))
+
     passed = 0
     failed = 0
 
-    for test_name, test_func in tests:
+    for (test_name, _), result in zip(tests, results):
         print(f"\n{test_name}...")
-        result = test_func(verbose)
-
         if result.passed:
             print(f"  ✓ PASS: {result.message}")
             passed += 1
@@ -343,7 +344,7 @@ def run_tests(verbose=False):
             failed += 1
 
         if verbose and result.details:
-            print(f"  Details: {json.dumps(result.details, indent=4)}")
+            print(f"  Details: {_json_text(result.details)}")
 
     print("\n" + "=" * 60)
     print(f"Results: {passed} passed, {failed} failed")
@@ -354,13 +355,20 @@ def run_tests(verbose=False):
 def main():
     parser = argparse.ArgumentParser(description="Test zclaw tool creation")
     parser.add_argument("-v", "--verbose", action="store_true", help="Show detailed output")
+    parser.add_argument("--no-cache", action="store_true", help=f"Bypass the response cache at {CACHE_PATH}")
     args = parser.parse_args()
 
     if not os.environ.get("ANTHROPIC_API_KEY"):
         print("Error: ANTHROPIC_API_KEY environment variable not set")
         sys.exit(1)
 
-    success = run_tests(args.verbose)
+    if not args.no_cache:
+        enable_response_cache()
+
+    if Draft202012Validator is None:
+        print("Note: jsonschema not installed; skipping create_tool schema validation (pip install jsonschema)")
+
+    success = asyncio.run(run_tests(args.verbose))
     sys.exit(0 if success else 1)
 
 
@@ -3,40 +3,57 @@
 
 from __future__ import annotations
 
-import importlib.util
+import asyncio
+import contextlib
+import io
+import json
 import sys
-from types import SimpleNamespace
 import unittest
 from pathlib import Path
+from types import MappingProxyType, SimpleNamespace
 from typing import Any
 from unittest.mock import Mock, patch
 
 
 TEST_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = TEST_DIR.parent.parent
-HARNESS_PATH = PROJECT_ROOT / "test" / "api" / "provider_harness.py"
+API_TEST_DIR = str(PROJECT_ROOT / "test" / "api")
+if API_TEST_DIR not in sys.path:
+    sys.path.insert(0, API_TEST_DIR)
 
-SPEC = importlib.util.spec_from_file_location("provider_harness", HARNESS_PATH)
-if SPEC is None or SPEC.loader is None:
-    raise RuntimeError(f"Unable to load provider harness from {HARNESS_PATH}")
-provider_harness = importlib.util.module_from_spec(SPEC)
-sys.modules[SPEC.name] = provider_harness
-SPEC.loader.exec_module(provider_harness)
+import provider_harness  # noqa: E402
 
 
-class ProviderHarnessTests(unittest.TestCase):
-    def test_openai_gpt5_uses_max_completion_tokens(self) -> None:
-        field, value = provider_harness._openai_like_max_tokens_field("gpt-5.4")
-        self.assertEqual(field, "max_completion_tokens")
-        self.assertEqual(value, 1024)
+def _response(payload: Any, *, status_code: int = 200, headers: dict[str, str] | None = None) -> Mock:
+    """httpx-like response carrying payload as JSON (or as-is when already bytes)."""
+    content = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+    response = Mock(status_code=status_code, headers=headers or {}, content=content)
+    response.raise_for_status.return_value = None
+    return response
 
-    def test_openai_non_gpt5_uses_max_tokens(self) -> None:
-        field, value = provider_harness._openai_like_max_tokens_field("gpt-4.1-mini")
-        self.assertEqual(field, "max_tokens")
-        self.assertEqual(value, 1024)
 
-    def test_extract_anthropic_round_tool_call(self) -> None:
-        response = {
+def _fake_client(responses: list[Any]) -> SimpleNamespace:
+    """Client whose post() returns responses in order, recording each request.
+
+    Entries are JSON payloads, or Mocks from _response when the status matters.
+    The decoded request bodies collect in .sent and the URLs in .urls.
+    """
+    client = SimpleNamespace(sent=[], urls=[])
+
+    def post(url: str, headers: dict[str, str], content: bytes) -> Mock:
+        client.urls.append(url)
+        client.sent.append(json.loads(content))
+        item = responses[len(client.sent) - 1]
+        return item if isinstance(item, Mock) else _response(item)
+
+    client.post = post
+    return client
+
+
+class ProviderHarnessTests(unittest.TestCase):
+    # Read-only fixtures shared across tests; the extractors never mutate responses.
+    _ANTHROPIC_TOOL_CALL_RESPONSE = MappingProxyType(
+        {
             "stop_reason": "tool_use",
             "content": [
                 {"type": "text", "text": "Calling tool"},
@@ -48,15 +65,10 @@ class ProviderHarnessTests(unittest.TestCase):
                 },
             ],
         }
-        text, tool_uses, done = provider_harness._extract_anthropic_round(response)
-        self.assertEqual(text, "Calling tool")
-        self.assertFalse(done)
-        self.assertEqual(len(tool_uses), 1)
-        self.assertEqual(tool_uses[0]["name"], "gpio_write")
-        self.assertEqual(tool_uses[0]["input"]["pin"], 2)
+    )
 
-    def test_extract_openai_round_tool_call(self) -> None:
-        response = {
+    _OPENAI_TOOL_CALL_RESPONSE = MappingProxyType(
+        {
             "choices": [
                 {
                     "finish_reason": "tool_calls",
@@ -77,17 +89,10 @@ class ProviderHarnessTests(unittest.TestCase):
                 }
             ]
         }
-        text, tool_uses, done, assistant_msg = provider_harness._extract_openai_round(response)
-        self.assertEqual(text, "")
-        self.assertFalse(done)
-        self.assertEqual(len(tool_uses), 1)
-        self.assertEqual(tool_uses[0]["name"], "gpio_write")
-        self.assertEqual(tool_uses[0]["input"]["pin"], 2)
-        self.assertEqual(assistant_msg["role"], "assistant")
-        self.assertIn("tool_calls", assistant_msg)
+    )
 
-    def test_extract_openai_round_bad_arguments_fallbacks_to_empty_object(self) -> None:
-        response = {
+    _OPENAI_BAD_ARGUMENTS_RESPONSE = MappingProxyType(
+        {
             "choices": [
                 {
                     "finish_reason": "tool_calls",
@@ -108,58 +113,481 @@ class ProviderHarnessTests(unittest.TestCase):
                 }
             ]
         }
-        _, tool_uses, done, _ = provider_harness._extract_openai_round(response)
+    )
+
+    def test_openai_gpt5_uses_max_completion_tokens(self) -> None:
+        field, value = provider_harness._openai_like_max_tokens_field("gpt-5.4")
+        self.assertEqual(field, "max_completion_tokens")
+        self.assertEqual(value, 1024)
+
+    def test_openai_non_gpt5_uses_max_tokens(self) -> None:
+        field, value = provider_harness._openai_like_max_tokens_field("gpt-4.1-mini")
+        self.assertEqual(field, "max_tokens")
+        self.assertEqual(value, 1024)
+
+    def test_extract_openai_round_without_choices_is_done(self) -> None:
+        text, tool_uses, done, assistant_msg, finish_reason = provider_harness._extract_openai_round({})
+        self.assertEqual((text, tool_uses, done, finish_reason), ("", [], True, None))
+        self.assertEqual(assistant_msg, {"role": "assistant", "content": ""})
+
+    def test_tool_defs_append_user_tools_in_provider_shape(self) -> None:
+        user_tools = {"water": {"description": "Water plants", "action": "gpio 5 on"}}
+
+        anthropic = provider_harness._tool_defs_for_provider(provider_harness.PROVIDERS["anthropic"], user_tools)
+        self.assertEqual(len(anthropic), len(provider_harness.TOOLS) + 1)
+        self.assertIs(anthropic[0], provider_harness.TOOLS[0])
+        self.assertEqual(anthropic[-1]["name"], "water")
+
+        openai = provider_harness._tool_defs_for_provider(provider_harness.PROVIDERS["openai"], user_tools)
+        self.assertEqual(openai[0]["function"]["name"], provider_harness.TOOLS[0]["name"])
+        self.assertEqual(openai[-1]["type"], "function")
+        self.assertEqual(openai[-1]["function"]["name"], "water")
+        self.assertEqual(openai[-1]["function"]["parameters"], {"type": "object", "properties": {}})
+
+    def test_refresh_tool_defs_json_reencodes_after_create_tool(self) -> None:
+        provider = provider_harness.PROVIDERS["openai"]
+        user_tools: dict[str, dict[str, str]] = {}
+
+        first = provider_harness._refresh_tool_defs_json(provider, user_tools, None)
+        self.assertIs(provider_harness._refresh_tool_defs_json(provider, user_tools, first), first)
+
+        provider_harness.handle_create_tool({"name": "blink", "description": "Blink", "action": "x"}, user_tools)
+        refreshed = provider_harness._refresh_tool_defs_json(provider, user_tools, first)
+        self.assertEqual(refreshed[0], 1)
+        self.assertEqual(json.loads(refreshed[1])[-1]["function"]["name"], "blink")
+
+    def test_execute_tool_prefers_user_tool_and_keeps_first_definition(self) -> None:
+        user_tools: dict[str, dict[str, str]] = {}
+        provider_harness.handle_create_tool({"name": "water", "description": "d", "action": "gpio 5 on"}, user_tools)
+        provider_harness.handle_create_tool({"name": "water", "description": "d", "action": "gpio 6 on"}, user_tools)
+
+        self.assertEqual(len(user_tools), 1)
+        self.assertEqual(
+            provider_harness.execute_tool("water", {}, user_tools),
+            "Execute this action now: gpio 5 on",
+        )
+        self.assertEqual(provider_harness.execute_tool("get_time", {}, user_tools), "2026-02-21 14:30:00 UTC")
+
+    def test_extract_anthropic_round_tool_call(self) -> None:
+        response = self._ANTHROPIC_TOOL_CALL_RESPONSE
+        text, tool_uses, done = provider_harness._extract_anthropic_round(response)
+        self.assertEqual(text, "Calling tool")
         self.assertFalse(done)
-        self.assertEqual(tool_uses[0]["input"], {})
+        self.assertEqual(len(tool_uses), 1)
+        self.assertEqual(tool_uses[0].name, "gpio_write")
+        self.assertEqual(tool_uses[0].input["pin"], 2)
+
+    def test_extract_anthropic_round_end_turn_ignores_tool_use(self) -> None:
+        response = {
+            "stop_reason": "end_turn",
+            "content": [
+                {"type": "tool_use", "id": "toolu_1", "name": "gpio_read", "input": {"pin": 4}},
+                {"type": "text", "text": "All done"},
+            ],
+        }
+        self.assertEqual(provider_harness._extract_anthropic_round(response), ("All done", [], True))
+
+    def test_extract_anthropic_round_skips_text_only_when_tools_follow(self) -> None:
+        tool_round = {
+            "stop_reason": "tool_use",
+            "content": [
+                {"type": "text", "text": "Reading"},
+                {"type": "tool_use", "id": "toolu_1", "name": "gpio_read", "input": {"pin": 4}},
+            ],
+        }
+        text, tool_uses, done = provider_harness._extract_anthropic_round(tool_round, want_text=False)
+        self.assertEqual((text, [t.id for t in tool_uses], done), ("", ["toolu_1"], False))
+
+        truncated = {"stop_reason": "max_tokens", "content": [{"type": "text", "text": "partial"}]}
+        self.assertEqual(provider_harness._extract_anthropic_round(truncated, want_text=False), ("partial", [], True))
+
+    def test_extract_openai_round_tool_call(self) -> None:
+        response = self._OPENAI_TOOL_CALL_RESPONSE
+        text, tool_uses, done, assistant_msg, finish_reason = provider_harness._extract_openai_round(response)
+        self.assertEqual(text, "")
+        self.assertFalse(done)
+        self.assertEqual(len(tool_uses), 1)
+        self.assertEqual(tool_uses[0].name, "gpio_write")
+        self.assertEqual(tool_uses[0].input["pin"], 2)
+        self.assertEqual(assistant_msg["role"], "assistant")
+        self.assertIn("tool_calls", assistant_msg)
+        self.assertEqual(finish_reason, "tool_calls")
+
+    def test_extract_openai_round_bad_arguments_fallbacks_to_empty_object(self) -> None:
+        response = self._OPENAI_BAD_ARGUMENTS_RESPONSE
+        _, tool_uses, done, _, _ = provider_harness._extract_openai_round(response)
+        self.assertFalse(done)
+        self.assertEqual(tool_uses[0].input, {})
 
     def test_call_api_openai_inserts_system_message_when_missing(self) -> None:
         provider = provider_harness.PROVIDERS["openai"]
         messages = [{"role": "user", "content": "Hello"}]
-        payload: dict[str, Any] = {}
+        client = _fake_client([{"ok": True}])
 
-        def fake_post(url: str, headers: dict[str, str], json: dict[str, Any], timeout: int) -> Mock:
-            payload["url"] = url
-            payload["headers"] = headers
-            payload["json"] = json
-            payload["timeout"] = timeout
-            response = Mock()
-            response.raise_for_status.return_value = None
-            response.json.return_value = {"ok": True}
-            return response
-
-        with patch.object(provider_harness, "httpx", SimpleNamespace(post=fake_post)):
-            result = provider_harness.call_api(provider, messages, "test-key", "gpt-4.1-mini", user_tools=[])
+        result = provider_harness.call_api(
+            provider,
+            messages,
+            "test-key",
+            "gpt-4.1-mini",
+            user_tools={},
+            client=client,
+        )
 
         self.assertEqual(result, {"ok": True})
-        self.assertEqual(payload["url"], provider.api_url)
-        self.assertEqual(payload["timeout"], 30)
-        request_json = payload["json"]
+        self.assertEqual(client.urls, [provider.api_url])
+        request_json = client.sent[0]
         self.assertEqual(request_json["messages"][0], {"role": "system", "content": provider_harness.SYSTEM_PROMPT})
         self.assertEqual(request_json["messages"][1], {"role": "user", "content": "Hello"})
         self.assertEqual(messages, [{"role": "user", "content": "Hello"}])
 
+    def test_build_request_body_matches_plain_payload(self) -> None:
+        user_tools = {"blink": {"description": "Blink the LED", "action": "gpio_write pin 2"}}
+        messages = [{"role": "user", "content": "Hi \u00e9"}]
+
+        tools_json = provider_harness._encode_tool_defs(provider_harness.PROVIDERS["anthropic"], user_tools)
+        _, body = provider_harness._build_request(
+            provider_harness.PROVIDERS["anthropic"], messages, "k", "claude-test", tools_json, stream=True
+        )
+        self.assertEqual(
+            json.loads(body),
+            {
+                "max_tokens": 1024,
+                "system": [
+                    {"type": "text", "text": provider_harness.SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}
+                ],
+                "model": "claude-test",
+                "tools": provider_harness._tool_defs_for_provider(provider_harness.PROVIDERS["anthropic"], user_tools),
+                "messages": messages,
+                "stream": True,
+            },
+        )
+
+        _, body = provider_harness._build_request(provider_harness.PROVIDERS["openai"], [], "k", "gpt-5-mini", b"[]")
+        request_json = json.loads(body)
+        self.assertEqual(request_json["messages"], [{"role": "system", "content": provider_harness.SYSTEM_PROMPT}])
+        self.assertEqual(request_json["max_completion_tokens"], 1024)
+        self.assertNotIn("stream", request_json)
+
+    def test_build_request_applies_provider_extra_headers(self) -> None:
+        headers, _ = provider_harness._build_request(provider_harness.PROVIDERS["openrouter"], [], "k", "openrouter/auto", b"[]")
+        self.assertEqual(headers["Authorization"], "Bearer k")
+        self.assertIn("HTTP-Referer", headers)
+        self.assertIn("X-Title", headers)
+
+        headers, _ = provider_harness._build_request(provider_harness.PROVIDERS["openai"], [], "k", "gpt-4.1-mini", b"[]")
+        self.assertNotIn("X-Title", headers)
+
+    def test_parse_tool_args_without_orjson(self) -> None:
+        with patch.object(provider_harness, "orjson", None):
+            self.assertEqual(provider_harness._parse_tool_args('{"pin":2}'), {"pin": 2})
+            self.assertEqual(provider_harness._parse_tool_args("{bad_json"), {})
+            self.assertEqual(provider_harness._json_bytes({"pin": 2}), b'{"pin":2}')
+
+    def test_run_conversation_anthropic_returns_results_in_call_order(self) -> None:
+        rounds = [
+            {
+                "stop_reason": "tool_use",
+                "content": [
+                    {"type": "tool_use", "id": "t1", "name": "gpio_read", "input": {"pin": 4}},
+                    {"type": "tool_use", "id": "t2", "name": "blink", "input": {}},
+                    {
+                        "type": "tool_use",
+                        "id": "t3",
+                        "name": "create_tool",
+                        "input": {"name": "blink", "description": "Blink", "action": "toggle GPIO 2"},
+                    },
+                    {"type": "tool_use", "id": "t4", "name": "get_time", "input": {}},
+                    {"type": "tool_use", "id": "t5", "name": "blink", "input": {}},
+                ],
+            },
+            {"stop_reason": "end_turn", "content": [{"type": "text", "text": "done"}]},
+        ]
+        client = _fake_client(rounds)
+
+        user_tools: dict[str, dict[str, str]] = {}
+        reply = provider_harness.run_conversation(
+            provider_harness.PROVIDERS["anthropic"],
+            "hello",
+            "test-key",
+            "claude-test",
+            user_tools,
+            verbose=False,
+            client=client,
+        )
+
+        self.assertEqual(reply, "done")
+        tool_results = client.sent[1]["messages"][-1]["content"]
+        self.assertEqual([r["tool_use_id"] for r in tool_results], ["t1", "t2", "t3", "t4", "t5"])
+        self.assertEqual(tool_results[0]["content"], "Pin 4 = HIGH")
+        # blink only exists once the create_tool call before it has run.
+        self.assertEqual(tool_results[1]["content"], "Unknown tool: blink")
+        self.assertEqual(tool_results[4]["content"], "Execute this action now: toggle GPIO 2")
+        self.assertIn("blink", user_tools)
+
+    def test_run_conversation_anthropic_keeps_earlier_tool_results(self) -> None:
+        rounds = [
+            {"stop_reason": "tool_use", "content": [{"type": "tool_use", "id": "t1", "name": "gpio_read", "input": {"pin": 4}}]},
+            {"stop_reason": "tool_use", "content": [{"type": "tool_use", "id": "t2", "name": "get_time", "input": {}}]},
+            {"stop_reason": "end_turn", "content": [{"type": "text", "text": "done"}]},
+        ]
+        client = _fake_client(rounds)
+
+        provider_harness.run_conversation(
+            provider_harness.PROVIDERS["anthropic"],
+            "hello",
+            "test-key",
+            "claude-test",
+            {},
+            verbose=False,
+            client=client,
+        )
+
+        history = client.sent[2]["messages"]
+        self.assertEqual([r["tool_use_id"] for r in history[2]["content"]], ["t1"])
+        self.assertEqual([r["tool_use_id"] for r in history[4]["content"]], ["t2"])
+
+    def test_run_conversation_openai_truncates_tool_results_older_than_previous_round(self) -> None:
+        long_action = "gpio_write pin 2 high, " * 10
+        tool_round = {
+            "choices": [
+                {
+                    "finish_reason": "tool_calls",
+                    "message": {
+                        "content": None,
+                        "tool_calls": [{"id": "c1", "type": "function", "function": {"name": "blink", "arguments": "{}"}}],
+                    },
+                }
+            ]
+        }
+        rounds = [tool_round] * 3 + [{"choices": [{"finish_reason": "stop", "message": {"content": "done"}}]}]
+        client = _fake_client(rounds)
+
+        provider_harness.run_conversation(
+            provider_harness.PROVIDERS["openai"],
+            "hello",
+            "test-key",
+            "gpt-4.1-mini",
+            {"blink": {"description": "Blink", "action": long_action}},
+            verbose=False,
+            client=client,
+        )
+
+        tool_contents = [m["content"] for m in client.sent[3]["messages"] if m["role"] == "tool"]
+        self.assertEqual(len(tool_contents), 3)
+        self.assertTrue(tool_contents[0].endswith("... (truncated)"))
+        self.assertEqual(tool_contents[1], f"Execute this action now: {long_action}")
+        self.assertEqual(tool_contents[2], f"Execute this action now: {long_action}")
+
+    def test_verbose_tool_output_summarizes_inputs_off_tty(self) -> None:
+        out = io.StringIO()
+        response = {
+            "stop_reason": "tool_use",
+            "content": [{"type": "tool_use", "id": "toolu_1", "name": "gpio_write", "input": {"pin": 2, "state": 1}}],
+        }
+        with contextlib.redirect_stdout(out):
+            provider_harness._apply_round(provider_harness.PROVIDERS["anthropic"], response, [], {}, 0, verbose=True)
+        self.assertEqual(
+            out.getvalue(),
+            "\n--- Round 1 (stop_reason: tool_use) ---\nTOOL CALL: gpio_write(<2 args>)\nTOOL RESULT: Pin 2 -> HIGH\n",
+        )
+
+    def test_stream_api_anthropic_rebuilds_tool_use_blocks(self) -> None:
+        events = [
+            {"type": "message_start", "message": {"id": "msg_1"}},
+            {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+            {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "On "}},
+            {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "it."}},
+            {"type": "content_block_stop", "index": 0},
+            {
+                "type": "content_block_start",
+                "index": 1,
+                "content_block": {"type": "tool_use", "id": "toolu_1", "name": "gpio_write", "input": {}},
+            },
+            {"type": "content_block_delta", "index": 1, "delta": {"type": "input_json_delta", "partial_json": '{"pin": 2,'}},
+            {"type": "content_block_delta", "index": 1, "delta": {"type": "input_json_delta", "partial_json": ' "state": 1}'}},
+            {"type": "content_block_stop", "index": 1},
+            {"type": "message_delta", "delta": {"stop_reason": "tool_use"}},
+            {"type": "message_stop"},
+        ]
+        lines = []
+        for event in events:
+            lines.extend([f"event: {event['type']}", f"data: {json.dumps(event)}", ""])
+        captured: dict[str, Any] = {}
+
+        @contextlib.contextmanager
+        def fake_stream(method: str, url: str, headers: dict[str, str], content: bytes):
+            captured["payload"] = json.loads(content)
+            yield SimpleNamespace(
+                status_code=200,
+                is_error=False,
+                raise_for_status=lambda: None,
+                iter_lines=lambda: iter(lines),
+            )
+
+        response = provider_harness.stream_api(
+            provider_harness.PROVIDERS["anthropic"],
+            [{"role": "user", "content": "turn on pin 2"}],
+            "k",
+            "claude-test",
+            {},
+            client=SimpleNamespace(stream=fake_stream),
+        )
+
+        self.assertTrue(captured["payload"]["stream"])
+        text, tool_uses, done = provider_harness._extract_anthropic_round(response)
+        self.assertEqual(text, "On it.")
+        self.assertEqual(tool_uses, [provider_harness.ToolUse("toolu_1", "gpio_write", {"pin": 2, "state": 1})])
+        self.assertFalse(done)
+
+    def test_accumulate_openai_stream_joins_tool_call_deltas(self) -> None:
+        lines = [
+            'data: {"choices":[{"index":0,"delta":{"role":"assistant","content":null,"tool_calls":'
+            '[{"index":0,"id":"call_1","type":"function","function":{"name":"gpio_read","arguments":""}}]}}]}',
+            ": OPENROUTER PROCESSING",
+            'data: {"choices":[{"index":0,"delta":{"tool_calls":[{"index":0,"function":{"arguments":"{\\"pin\\""}}]}}]}',
+            'data: {"choices":[{"index":0,"delta":{"tool_calls":[{"index":0,"function":{"arguments":": 4}"}}]}}]}',
+            'data: {"choices":[{"index":0,"delta":{},"finish_reason":"tool_calls"}]}',
+            "data: [DONE]",
+        ]
+
+        response = provider_harness._accumulate_openai_stream(provider_harness._iter_sse_data(lines))
+        _, tool_uses, done, assistant_msg, finish_reason = provider_harness._extract_openai_round(response)
+
+        self.assertEqual(tool_uses, [provider_harness.ToolUse("call_1", "gpio_read", {"pin": 4})])
+        self.assertFalse(done)
+        self.assertEqual(finish_reason, "tool_calls")
+        self.assertEqual(assistant_msg["tool_calls"][0]["function"]["arguments"], '{"pin": 4}')
+
+    def test_arun_conversations_keeps_input_order(self) -> None:
+        async def fake_post(url: str, headers: dict[str, str], content: bytes) -> Mock:
+            request = json.loads(content)
+            prompt = request["messages"][-1]["content"]
+            await asyncio.sleep(0.01 if prompt == "first" else 0)
+            return _response({"stop_reason": "end_turn", "content": [{"type": "text", "text": f"reply to {prompt}"}]})
+
+        replies = asyncio.run(
+            provider_harness.arun_conversations(
+                provider_harness.PROVIDERS["anthropic"],
+                ["first", "second"],
+                "test-key",
+                "claude-test",
+                concurrency=2,
+                client=SimpleNamespace(post=fake_post),
+            )
+        )
+        self.assertEqual(replies, ["reply to first", "reply to second"])
+
+    def test_arun_conversations_batched_resubmits_unfinished_cases(self) -> None:
+        provider = provider_harness.PROVIDERS["anthropic"]
+        batch_url = f"{provider.api_url}/batches"
+        submitted: list[list[str]] = []
+        replies = {
+            "case-0": [{"stop_reason": "end_turn", "content": [{"type": "text", "text": "a"}]}],
+            "case-1": [
+                {"stop_reason": "tool_use", "content": [{"type": "tool_use", "id": "t1", "name": "gpio_read", "input": {"pin": 4}}]},
+                {"stop_reason": "end_turn", "content": [{"type": "text", "text": "b"}]},
+            ],
+        }
+
+        async def fake_post(url: str, headers: dict[str, str], content: bytes) -> Mock:
+            self.assertEqual(url, batch_url)
+            submitted.append([request["custom_id"] for request in json.loads(content)["requests"]])
+            return _response({"id": f"b{len(submitted)}", "processing_status": "in_progress"})
+
+        async def fake_get(url: str, headers: dict[str, str]) -> Mock:
+            batch_id = f"b{len(submitted)}"
+            if url == f"{batch_url}/{batch_id}":
+                batch = {"id": batch_id, "processing_status": "ended", "results_url": f"results/{batch_id}"}
+                return _response(batch)
+            round_num = len(submitted) - 1
+            lines = [
+                json.dumps({"custom_id": cid, "result": {"type": "succeeded", "message": replies[cid][round_num]}})
+                for cid in submitted[-1]
+            ]
+            return _response("\n".join(lines).encode("utf-8"))
+
+        with patch.object(provider_harness, "BATCH_POLL_INITIAL_S", 0):
+            results = asyncio.run(
+                provider_harness.arun_conversations_batched(
+                    provider,
+                    ["first", "second"],
+                    "test-key",
+                    "claude-test",
+                    client=SimpleNamespace(post=fake_post, get=fake_get),
+                )
+            )
+
+        self.assertEqual(results, ["a", "b"])
+        self.assertEqual(submitted, [["case-0", "case-1"], ["case-1"]])
+
+    def test_call_api_retries_rate_limit_then_succeeds(self) -> None:
+        client = _fake_client(
+            [
+                _response({"ok": True}, status_code=429, headers={"retry-after": "2"}),
+                _response({"ok": True}, status_code=503),
+                _response({"ok": True}),
+            ]
+        )
+
+        with patch.object(provider_harness.time, "sleep") as sleep:
+            result = provider_harness.call_api(
+                provider_harness.PROVIDERS["anthropic"],
+                [{"role": "user", "content": "Hello"}],
+                "test-key",
+                "claude-test",
+                user_tools={},
+                client=client,
+            )
+
+        self.assertEqual(result, {"ok": True})
+        self.assertEqual(len(client.sent), 3)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(sleep.call_args_list[0].args[0], 2.0)
+
+    @unittest.skipIf(provider_harness.Draft202012Validator is None, "jsonschema not installed")
+    def test_validate_tool_input_reports_schema_errors(self) -> None:
+        self.assertEqual(provider_harness.validate_tool_input("gpio_write", {"pin": 2, "state": 1}), [])
+        self.assertTrue(provider_harness.validate_tool_input("gpio_write", {"state": 1}))
+        self.assertEqual(provider_harness.validate_tool_input("blink", {}), [])
+
+    def test_validate_tool_input_requires_jsonschema(self) -> None:
+        with patch.object(provider_harness, "Draft202012Validator", None):
+            with self.assertRaises(RuntimeError):
+                provider_harness.validate_tool_input("gpio_write", {})
+
+    def test_shared_client_requires_httpx(self) -> None:
+        with patch.object(provider_harness, "httpx", None), patch.object(provider_harness, "_shared_client", None):
+            with self.assertRaises(RuntimeError):
+                provider_harness.shared_client()
+
+    def test_shared_client_is_created_once_and_closed_at_exit(self) -> None:
+        client = Mock()
+        with patch.object(provider_harness, "_shared_client", None), patch.object(
+            provider_harness, "create_client", return_value=client
+        ) as create, patch.object(provider_harness.atexit, "register") as register:
+            self.assertIs(provider_harness.shared_client(), client)
+            self.assertIs(provider_harness.shared_client(), client)
+        create.assert_called_once_with()
+        register.assert_called_once_with(client.close)
+
     def test_call_api_openai_keeps_existing_system_message(self) -> None:
         provider = provider_harness.PROVIDERS["openai"]
         messages = [
             {"role": "system", "content": "custom system prompt"},
             {"role": "user", "content": "Hello"},
         ]
-        payload: dict[str, Any] = {}
-
-        def fake_post(url: str, headers: dict[str, str], json: dict[str, Any], timeout: int) -> Mock:
-            payload["url"] = url
-            payload["headers"] = headers
-            payload["json"] = json
-            payload["timeout"] = timeout
-            response = Mock()
-            response.raise_for_status.return_value = None
-            response.json.return_value = {"ok": True}
-            return response
-
-        with patch.object(provider_harness, "httpx", SimpleNamespace(post=fake_post)):
-            provider_harness.call_api(provider, messages, "test-key", "gpt-4.1-mini", user_tools=[])
-
-        request_json = payload["json"]
+        client = _fake_client([{"ok": True}])
+
+        provider_harness.call_api(
+            provider,
+            messages,
+            "test-key",
+            "gpt-4.1-mini",
+            user_tools={},
+            client=client,
+        )
+
+        request_json = client.sent[0]
         self.assertEqual(request_json["messages"], messages)
 
 
@@ -13,7 +13,9 @@ from unittest import mock
 
 TEST_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = TEST_DIR.parent.parent
-sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+SCRIPTS_DIR = str(PROJECT_ROOT / "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
 
 import benchmark_latency
 from benchmark_latency import RequestSample, build_request_message
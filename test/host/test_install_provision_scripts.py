@@ -4,8 +4,9 @@
 from __future__ import annotations
 
 import os
-import stat
+import shutil
 import subprocess
+import sys
 import tempfile
 import unittest
 from pathlib import Path
@@ -22,29 +23,134 @@ ERASE_SH = PROJECT_ROOT / "scripts" / "erase.sh"
 BUILD_SH = PROJECT_ROOT / "scripts" / "build.sh"
 FLASH_SH = PROJECT_ROOT / "scripts" / "flash.sh"
 
+# Credentials provision-dev.sh / telegram-clear-backlog.sh fall back to when a
+# profile leaves them unset; a developer's exported keys must not leak in.
+_CREDENTIAL_ENV_KEYS = frozenset(
+    {
+        "ZCLAW_API_KEY",
+        "OPENAI_API_KEY",
+        "ANTHROPIC_API_KEY",
+        "OPENROUTER_API_KEY",
+        "OLLAMA_API_KEY",
+        "ZCLAW_TG_TOKEN",
+    }
+)
+
+_LSOF_EXIT1 = "#!/bin/sh\nexit 1\n"
+_UNAME_LINUX = "#!/bin/sh\necho Linux\n"
+_NMCLI_FROM_ENV = "#!/bin/sh\nprintf '%s\\n' \"$NMCLI_OUTPUT\"\n"
+_DUMP_ERASE_ARGS = "#!/bin/sh\nprintf '%s\\n' \"$@\" > \"$ERASE_ARGS_FILE\"\n"
+_DUMP_IDF_ARGS = "#!/bin/sh\nprintf '%s\\n' \"$@\" > \"$IDF_ARGS_FILE\"\n"
+_DUMP_PROVISION_ARGS = "#!/bin/sh\nprintf '%s\\n' \"$@\" > \"$ARGS_FILE\"\n"
+_ESPTOOL_FROM_ENV = "#!/bin/sh\nprintf '%s\\n' \"$ESPTOOL_OUTPUT\"\n"
+_ESPEFUSE_UNENCRYPTED = "#!/bin/sh\nprintf '%s\\n' 'FLASH_CRYPT_CNT = 0'\n"
+_NVS_GEN_CAPTURE_CSV = (
+    "#!/bin/sh\n"
+    "if [ \"$2\" = \"generate\" ]; then\n"
+    "  cp \"$3\" \"$CSV_CAPTURE\"\n"
+    "  : > \"$4\"\n"
+    "  exit 0\n"
+    "fi\n"
+    "exit 0\n"
+)
+
 
 def _write_executable(path: Path, content: str) -> None:
-    path.write_text(content, encoding="utf-8")
-    mode = path.stat().st_mode
-    path.chmod(mode | stat.S_IXUSR)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o755)
+    try:
+        os.write(fd, content.encode("utf-8"))
+        # The open() mode is filtered by umask; fchmod makes it deterministic.
+        os.fchmod(fd, 0o755)
+    finally:
+        os.close(fd)
+
+
+def _materialize_fake_idf_home(home: Path) -> None:
+    idf_dir = home / "esp" / "esp-idf"
+    nvs_gen = idf_dir / "components" / "nvs_flash" / "nvs_partition_generator" / "nvs_partition_gen.py"
+    parttool = idf_dir / "components" / "partition_table" / "parttool.py"
+    nvs_gen.parent.mkdir(parents=True, exist_ok=True)
+    parttool.parent.mkdir(parents=True, exist_ok=True)
+    nvs_gen.write_text("# nvs generator stub path\n", encoding="utf-8")
+    parttool.write_text("# parttool stub path\n", encoding="utf-8")
+    (idf_dir / "export.sh").write_text(
+        "export IDF_PATH=\"$HOME/esp/esp-idf\"\n",
+        encoding="utf-8",
+    )
+
+
+@unittest.skipUnless(
+    sys.platform.startswith(("linux", "darwin")) and shutil.which("bash") is not None,
+    "install/provision scripts require a POSIX host with bash",
+)
+class InstallProvisionScriptTests(unittest.TestCase):
+    _PREFS_QEMU_N = """# zclaw install.sh preferences
+INSTALL_IDF=n
+REPAIR_IDF=
+INSTALL_QEMU=n
+INSTALL_CJSON=
+BUILD_NOW=n
+REPAIR_BUILD_IDF=
+FLASH_NOW=
+FLASH_MODE=1
+PROVISION_NOW=
+MONITOR_AFTER_FLASH=
+LAST_PORT=
+"""
+    _PREFS_QEMU_Y = """# zclaw install.sh preferences
+INSTALL_IDF=n
+REPAIR_IDF=
+INSTALL_QEMU=y
+INSTALL_CJSON=
+BUILD_NOW=n
+REPAIR_BUILD_IDF=
+FLASH_NOW=
+FLASH_MODE=1
+PROVISION_NOW=
+MONITOR_AFTER_FLASH=
+LAST_PORT=
+"""
 
+    _base_env: dict[str, str]
+    fake_idf_home: Path
+    fake_port: Path
+    stub_bin_dir: Path
+    linux_bin_dir: Path
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        # os.environ.copy() re-decodes every entry; copying a plain dict does not.
+        cls._base_env = {k: v for k, v in os.environ.items() if k not in _CREDENTIAL_ENV_KEYS}
+
+        # The scripts only read $HOME/esp, so one fake ESP-IDF tree serves every
+        # test; per-test shims still go in each test's own bin dir.
+        fixture_root = Path(tempfile.mkdtemp(prefix="zclaw-script-tests-"))
+        cls.addClassCleanup(shutil.rmtree, fixture_root, ignore_errors=True)
+        cls.fake_idf_home = fixture_root / "home"
+        _materialize_fake_idf_home(cls.fake_idf_home)
+        # Flash/erase scripts only stat the port; the shims never open it.
+        cls.fake_port = fixture_root / "ttyUSB0"
+        cls.fake_port.touch()
+
+        # Shims whose behavior never varies per test; anything that records
+        # arguments still goes in the test's own bin dir, ahead of these on PATH.
+        cls.stub_bin_dir = fixture_root / "bin"
+        cls.stub_bin_dir.mkdir()
+        _write_executable(cls.stub_bin_dir / "lsof", _LSOF_EXIT1)
+        _write_executable(cls.stub_bin_dir / "nmcli", _NMCLI_FROM_ENV)
+        cls.linux_bin_dir = fixture_root / "linux-bin"
+        cls.linux_bin_dir.mkdir()
+        _write_executable(cls.linux_bin_dir / "uname", _UNAME_LINUX)
 
-class InstallProvisionScriptTests(unittest.TestCase):
     def _prepare_fake_idf_env(self, tmp: Path) -> tuple[dict[str, str], Path]:
-        home = tmp / "home"
-        export_dir = home / "esp" / "esp-idf"
-        export_dir.mkdir(parents=True, exist_ok=True)
-        (export_dir / "export.sh").write_text(
-            "export IDF_PATH=\"$HOME/esp/esp-idf\"\n",
-            encoding="utf-8",
-        )
+        home = self.fake_idf_home
 
         bin_dir = tmp / "bin"
         bin_dir.mkdir(parents=True, exist_ok=True)
 
-        env = os.environ.copy()
+        env = dict(self._base_env)
         env["HOME"] = str(home)
-        env["PATH"] = f"{bin_dir}:/usr/bin:/bin:/usr/sbin:/sbin"
+        env["PATH"] = f"{bin_dir}:{self.stub_bin_dir}:/usr/bin:/bin:/usr/sbin:/sbin"
         env["TERM"] = "dumb"
         return env, bin_dir
 
@@ -56,7 +162,7 @@ class InstallProvisionScriptTests(unittest.TestCase):
             config_dir.mkdir(parents=True, exist_ok=True)
             (config_dir / "install.env").write_text(prefs_text, encoding="utf-8")
 
-            env = os.environ.copy()
+            env = dict(self._base_env)
             env["HOME"] = str(home)
             env["XDG_CONFIG_HOME"] = str(home / ".config")
             # Keep PATH narrow so QEMU is treated as missing in CI/macOS hosts.
@@ -83,39 +189,13 @@ class InstallProvisionScriptTests(unittest.TestCase):
             )
 
     def test_install_auto_applies_saved_qemu_choice(self) -> None:
-        prefs = """# zclaw install.sh preferences
-INSTALL_IDF=n
-REPAIR_IDF=
-INSTALL_QEMU=n
-INSTALL_CJSON=
-BUILD_NOW=n
-REPAIR_BUILD_IDF=
-FLASH_NOW=
-FLASH_MODE=1
-PROVISION_NOW=
-MONITOR_AFTER_FLASH=
-LAST_PORT=
-"""
-        proc = self._run_install_with_prefs(prefs, [])
+        proc = self._run_install_with_prefs(self._PREFS_QEMU_N, [])
         output = f"{proc.stdout}\n{proc.stderr}"
         self.assertEqual(proc.returncode, 0, msg=output)
         self.assertIn("Install QEMU for ESP32 emulation?: no (saved)", output)
 
     def test_install_cli_override_beats_saved_qemu_choice(self) -> None:
-        prefs = """# zclaw install.sh preferences
-INSTALL_IDF=n
-REPAIR_IDF=
-INSTALL_QEMU=y
-INSTALL_CJSON=
-BUILD_NOW=n
-REPAIR_BUILD_IDF=
-FLASH_NOW=
-FLASH_MODE=1
-PROVISION_NOW=
-MONITOR_AFTER_FLASH=
-LAST_PORT=
-"""
-        proc = self._run_install_with_prefs(prefs, ["--no-qemu"])
+        proc = self._run_install_with_prefs(self._PREFS_QEMU_Y, ["--no-qemu"])
         output = f"{proc.stdout}\n{proc.stderr}"
         self.assertEqual(proc.returncode, 0, msg=output)
         self.assertIn("Install QEMU for ESP32 emulation?: no", output)
@@ -155,7 +235,7 @@ LAST_PORT=
                 "exit 0\n",
             )
 
-            env = os.environ.copy()
+            env = dict(self._base_env)
             env["HOME"] = str(home)
             env["XDG_CONFIG_HOME"] = str(home / ".config")
             env["PATH"] = f"{bin_dir}:/usr/bin:/bin:/usr/sbin:/sbin"
@@ -212,7 +292,7 @@ LAST_PORT=
                     "exit 127\n",
                 )
 
-            env = os.environ.copy()
+            env = dict(self._base_env)
             env["HOME"] = str(home)
             env["XDG_CONFIG_HOME"] = str(home / ".config")
             env["PATH"] = f"{bin_dir}:/usr/bin:/bin:/usr/sbin:/sbin"
@@ -272,11 +352,7 @@ LAST_PORT=
             args_file = tmp / "idf-args.txt"
             env["IDF_ARGS_FILE"] = str(args_file)
 
-            _write_executable(
-                bin_dir / "idf.py",
-                "#!/bin/sh\n"
-                "printf '%s\\n' \"$@\" > \"$IDF_ARGS_FILE\"\n",
-            )
+            _write_executable(bin_dir / "idf.py", _DUMP_IDF_ARGS)
 
             proc = subprocess.run(
                 [str(BUILD_SH), "--box-3"],
@@ -301,11 +377,7 @@ LAST_PORT=
             args_file = tmp / "idf-args.txt"
             env["IDF_ARGS_FILE"] = str(args_file)
 
-            _write_executable(
-                bin_dir / "idf.py",
-                "#!/bin/sh\n"
-                "printf '%s\\n' \"$@\" > \"$IDF_ARGS_FILE\"\n",
-            )
+            _write_executable(bin_dir / "idf.py", _DUMP_IDF_ARGS)
 
             proc = subprocess.run(
                 [str(BUILD_SH), "--t-relay"],
@@ -327,34 +399,14 @@ LAST_PORT=
         with tempfile.TemporaryDirectory() as td:
             tmp = Path(td)
             env, bin_dir = self._prepare_fake_idf_env(tmp)
-            fake_port = tmp / "ttyUSB0"
-            fake_port.touch()
+            fake_port = self.fake_port
             args_file = tmp / "idf-args.txt"
             env["IDF_ARGS_FILE"] = str(args_file)
 
-            _write_executable(
-                bin_dir / "idf.py",
-                "#!/bin/sh\n"
-                "printf '%s\\n' \"$@\" > \"$IDF_ARGS_FILE\"\n",
-            )
-            _write_executable(
-                bin_dir / "lsof",
-                "#!/bin/sh\n"
-                "exit 1\n",
-            )
-            _write_executable(
-                bin_dir / "esptool.py",
-                "#!/bin/sh\n"
-                "cat <<'EOF'\n"
-                "Chip is ESP32-S3 (QFN56)\n"
-                "MAC: AA:BB:CC:DD:EE:FF\n"
-                "EOF\n",
-            )
-            _write_executable(
-                bin_dir / "espefuse.py",
-                "#!/bin/sh\n"
-                "printf '%s\\n' 'FLASH_CRYPT_CNT = 0'\n",
-            )
+            _write_executable(bin_dir / "idf.py", _DUMP_IDF_ARGS)
+            env["ESPTOOL_OUTPUT"] = "Chip is ESP32-S3 (QFN56)\nMAC: AA:BB:CC:DD:EE:FF"
+            _write_executable(bin_dir / "esptool.py", _ESPTOOL_FROM_ENV)
+            _write_executable(bin_dir / "espefuse.py", _ESPEFUSE_UNENCRYPTED)
 
             proc = subprocess.run(
                 [str(FLASH_SH), "--box-3", str(fake_port)],
@@ -378,34 +430,14 @@ LAST_PORT=
         with tempfile.TemporaryDirectory() as td:
             tmp = Path(td)
             env, bin_dir = self._prepare_fake_idf_env(tmp)
-            fake_port = tmp / "ttyUSB0"
-            fake_port.touch()
+            fake_port = self.fake_port
             args_file = tmp / "idf-args.txt"
             env["IDF_ARGS_FILE"] = str(args_file)
 
-            _write_executable(
-                bin_dir / "idf.py",
-                "#!/bin/sh\n"
-                "printf '%s\\n' \"$@\" > \"$IDF_ARGS_FILE\"\n",
-            )
-            _write_executable(
-                bin_dir / "lsof",
-                "#!/bin/sh\n"
-                "exit 1\n",
-            )
-            _write_executable(
-                bin_dir / "esptool.py",
-                "#!/bin/sh\n"
-                "cat <<'EOF'\n"
-                "Chip is ESP32 (D0WDQ6)\n"
-                "MAC: AA:BB:CC:DD:EE:FF\n"
-                "EOF\n",
-            )
-            _write_executable(
-                bin_dir / "espefuse.py",
-                "#!/bin/sh\n"
-                "printf '%s\\n' 'FLASH_CRYPT_CNT = 0'\n",
-            )
+            _write_executable(bin_dir / "idf.py", _DUMP_IDF_ARGS)
+            env["ESPTOOL_OUTPUT"] = "Chip is ESP32 (D0WDQ6)\nMAC: AA:BB:CC:DD:EE:FF"
+            _write_executable(bin_dir / "esptool.py", _ESPTOOL_FROM_ENV)
+            _write_executable(bin_dir / "espefuse.py", _ESPEFUSE_UNENCRYPTED)
 
             proc = subprocess.run(
                 [str(FLASH_SH), "--t-relay", str(fake_port)],
@@ -429,13 +461,16 @@ LAST_PORT=
         with tempfile.TemporaryDirectory() as td:
             tmp = Path(td)
             env, bin_dir = self._prepare_fake_idf_env(tmp)
-            fake_port = tmp / "ttyUSB0"
-            fake_port.touch()
+            fake_port = self.fake_port
             args_file = tmp / "idf-args.txt"
             env["IDF_ARGS_FILE"] = str(args_file)
 
+            # This test adds esptool to the IDF tree, so it needs a private copy.
+            home = tmp / "home"
+            _materialize_fake_idf_home(home)
+            env["HOME"] = str(home)
             esptool_script = (
-                tmp / "home" / "esp" / "esp-idf" / "components" / "esptool_py" / "esptool" / "esptool.py"
+                home / "esp" / "esp-idf" / "components" / "esptool_py" / "esptool" / "esptool.py"
             )
             esptool_script.parent.mkdir(parents=True, exist_ok=True)
             esptool_script.write_text(
@@ -447,21 +482,8 @@ LAST_PORT=
                 encoding="utf-8",
             )
 
-            _write_executable(
-                bin_dir / "idf.py",
-                "#!/bin/sh\n"
-                "printf '%s\\n' \"$@\" > \"$IDF_ARGS_FILE\"\n",
-            )
-            _write_executable(
-                bin_dir / "lsof",
-                "#!/bin/sh\n"
-                "exit 1\n",
-            )
-            _write_executable(
-                bin_dir / "espefuse.py",
-                "#!/bin/sh\n"
-                "printf '%s\\n' 'FLASH_CRYPT_CNT = 0'\n",
-            )
+            _write_executable(bin_dir / "idf.py", _DUMP_IDF_ARGS)
+            _write_executable(bin_dir / "espefuse.py", _ESPEFUSE_UNENCRYPTED)
 
             proc = subprocess.run(
                 [str(FLASH_SH), "--box-3", str(fake_port)],
@@ -482,19 +504,10 @@ LAST_PORT=
         with tempfile.TemporaryDirectory() as td:
             tmp = Path(td)
             env, bin_dir = self._prepare_fake_idf_env(tmp)
-            fake_port = tmp / "ttyUSB0"
-            fake_port.touch()
+            fake_port = self.fake_port
 
-            _write_executable(
-                bin_dir / "lsof",
-                "#!/bin/sh\n"
-                "exit 1\n",
-            )
-            _write_executable(
-                bin_dir / "esptool.py",
-                "#!/bin/sh\n"
-                "printf '%s\\n' 'Chip is ESP32-C3 (QFN32)'\n",
-            )
+            env["ESPTOOL_OUTPUT"] = "Chip is ESP32-C3 (QFN32)"
+            _write_executable(bin_dir / "esptool.py", _ESPTOOL_FROM_ENV)
 
             proc = subprocess.run(
                 [str(FLASH_SH), "--box-3", str(fake_port)],
@@ -514,19 +527,10 @@ LAST_PORT=
         with tempfile.TemporaryDirectory() as td:
             tmp = Path(td)
             env, bin_dir = self._prepare_fake_idf_env(tmp)
-            fake_port = tmp / "ttyUSB0"
-            fake_port.touch()
+            fake_port = self.fake_port
 
-            _write_executable(
-                bin_dir / "lsof",
-                "#!/bin/sh\n"
-                "exit 1\n",
-            )
-            _write_executable(
-                bin_dir / "esptool.py",
-                "#!/bin/sh\n"
-                "printf '%s\\n' 'Chip is ESP32-S3 (QFN56)'\n",
-            )
+            env["ESPTOOL_OUTPUT"] = "Chip is ESP32-S3 (QFN56)"
+            _write_executable(bin_dir / "esptool.py", _ESPTOOL_FROM_ENV)
 
             proc = subprocess.run(
                 [str(FLASH_SH), "--t-relay", str(fake_port)],
@@ -543,35 +547,20 @@ LAST_PORT=
             self.assertIn("ESP32-S3", output)
 
     def _run_provision_detect(self, env_ssid: str, nmcli_output: str) -> subprocess.CompletedProcess[str]:
-        with tempfile.TemporaryDirectory() as td:
-            tmp = Path(td)
-            bin_dir = tmp / "bin"
-            bin_dir.mkdir(parents=True, exist_ok=True)
-
-            _write_executable(
-                bin_dir / "uname",
-                "#!/bin/sh\n"
-                "echo Linux\n",
-            )
-            _write_executable(
-                bin_dir / "nmcli",
-                "#!/bin/sh\n"
-                f"printf '%s\\n' '{nmcli_output}'\n",
-            )
-
-            env = os.environ.copy()
-            env["PATH"] = f"{bin_dir}:/usr/bin:/bin"
-            env["ZCLAW_WIFI_SSID"] = env_ssid
-            env["TERM"] = "dumb"
+        env = dict(self._base_env)
+        env["PATH"] = f"{self.linux_bin_dir}:{self.stub_bin_dir}:/usr/bin:/bin"
+        env["ZCLAW_WIFI_SSID"] = env_ssid
+        env["NMCLI_OUTPUT"] = nmcli_output
+        env["TERM"] = "dumb"
 
-            return subprocess.run(
-                [str(PROVISION_SH), "--print-detected-ssid"],
-                cwd=PROJECT_ROOT,
-                env=env,
-                text=True,
-                capture_output=True,
-                check=False,
-            )
+        return subprocess.run(
+            [str(PROVISION_SH), "--print-detected-ssid"],
+            cwd=PROJECT_ROOT,
+            env=env,
+            text=True,
+            capture_output=True,
+            check=False,
+        )
 
     def test_provision_detect_ignores_placeholder_env_ssid(self) -> None:
         proc = self._run_provision_detect("<redacted>", "yes:RealNetwork")
@@ -585,20 +574,36 @@ LAST_PORT=
         self.assertEqual(proc.returncode, 0, msg=output)
         self.assertEqual(proc.stdout.strip(), ":smiley:")
 
-    def _run_provision_api_check_fail(self, backend: str) -> subprocess.CompletedProcess[str]:
-        with tempfile.TemporaryDirectory() as td:
-            tmp = Path(td)
-            bin_dir = tmp / "bin"
-            bin_dir.mkdir(parents=True, exist_ok=True)
+    def _run_provision(
+        self,
+        args: list[str],
+        *,
+        bin_dir: Path | None = None,
+        extra_env: dict[str, str] | None = None,
+        input_text: str | None = None,
+    ) -> subprocess.CompletedProcess[str]:
+        env = dict(self._base_env)
+        env["HOME"] = str(self.fake_idf_home)
+        env["PATH"] = "/usr/bin:/bin:/usr/sbin:/sbin"
+        if bin_dir is not None:
+            env["PATH"] = f"{bin_dir}:{env['PATH']}"
+        env["TERM"] = "dumb"
+        if extra_env:
+            env.update(extra_env)
 
-            home = tmp / "home"
-            export_dir = home / "esp" / "esp-idf"
-            export_dir.mkdir(parents=True, exist_ok=True)
-            (export_dir / "export.sh").write_text(
-                "export IDF_PATH=\"$HOME/esp/esp-idf\"\n",
-                encoding="utf-8",
-            )
+        return subprocess.run(
+            [str(PROVISION_SH), *args],
+            cwd=PROJECT_ROOT,
+            env=env,
+            text=True,
+            input=input_text,
+            capture_output=True,
+            check=False,
+        )
 
+    def _run_provision_api_check_fail(self, backend: str) -> subprocess.CompletedProcess[str]:
+        with tempfile.TemporaryDirectory() as td:
+            bin_dir = Path(td)
             _write_executable(
                 bin_dir / "curl",
                 "#!/bin/sh\n"
@@ -613,14 +618,8 @@ LAST_PORT=
                 "printf '%s' '401'\n",
             )
 
-            env = os.environ.copy()
-            env["HOME"] = str(home)
-            env["PATH"] = f"{bin_dir}:/usr/bin:/bin"
-            env["TERM"] = "dumb"
-
-            return subprocess.run(
+            return self._run_provision(
                 [
-                    str(PROVISION_SH),
                     "--yes",
                     "--port",
                     "/dev/null",
@@ -633,11 +632,7 @@ LAST_PORT=
                     "--api-key",
                     "sk-test",
                 ],
-                cwd=PROJECT_ROOT,
-                env=env,
-                text=True,
-                capture_output=True,
-                check=False,
+                bin_dir=bin_dir,
             )
 
     def _run_provision_api_check_capture_url(
@@ -652,14 +647,6 @@ LAST_PORT=
             bin_dir.mkdir(parents=True, exist_ok=True)
             curl_url_file = tmp / "curl-url.txt"
 
-            home = tmp / "home"
-            export_dir = home / "esp" / "esp-idf"
-            export_dir.mkdir(parents=True, exist_ok=True)
-            (export_dir / "export.sh").write_text(
-                "export IDF_PATH=\"$HOME/esp/esp-idf\"\n",
-                encoding="utf-8",
-            )
-
             _write_executable(
                 bin_dir / "curl",
                 "#!/bin/sh\n"
@@ -690,15 +677,8 @@ LAST_PORT=
                 "printf '%s' '401'\n",
             )
 
-            env = os.environ.copy()
-            env["HOME"] = str(home)
-            env["PATH"] = f"{bin_dir}:/usr/bin:/bin"
-            env["TERM"] = "dumb"
-            env["CURL_URL_FILE"] = str(curl_url_file)
-
-            proc = subprocess.run(
+            proc = self._run_provision(
                 [
-                    str(PROVISION_SH),
                     "--yes",
                     "--port",
                     "/dev/null",
@@ -713,101 +693,53 @@ LAST_PORT=
                     "--api-url",
                     api_url,
                 ],
-                cwd=PROJECT_ROOT,
-                env=env,
-                text=True,
-                capture_output=True,
-                check=False,
+                bin_dir=bin_dir,
+                extra_env={"CURL_URL_FILE": str(curl_url_file)},
             )
 
             called_url = curl_url_file.read_text(encoding="utf-8") if curl_url_file.exists() else ""
             return proc, called_url
 
     def _run_provision_ollama_missing_api_url(self) -> subprocess.CompletedProcess[str]:
-        with tempfile.TemporaryDirectory() as td:
-            tmp = Path(td)
-            home = tmp / "home"
-            export_dir = home / "esp" / "esp-idf"
-            export_dir.mkdir(parents=True, exist_ok=True)
-            (export_dir / "export.sh").write_text(
-                "export IDF_PATH=\"$HOME/esp/esp-idf\"\n",
-                encoding="utf-8",
-            )
-
-            env = os.environ.copy()
-            env["HOME"] = str(home)
-            env["PATH"] = "/usr/bin:/bin:/usr/sbin:/sbin"
-            env["TERM"] = "dumb"
-
-            return subprocess.run(
-                [
-                    str(PROVISION_SH),
-                    "--yes",
-                    "--skip-api-check",
-                    "--port",
-                    "/dev/null",
-                    "--ssid",
-                    "TestNet",
-                    "--pass",
-                    "password123",
-                    "--backend",
-                    "ollama",
-                ],
-                cwd=PROJECT_ROOT,
-                env=env,
-                text=True,
-                capture_output=True,
-                check=False,
-            )
-
-    def _run_provision_length_validation(
-        self,
-        *,
-        ssid: str,
-        wifi_pass: str,
-        tg_chat_ids: str | None = None,
-    ) -> subprocess.CompletedProcess[str]:
-        with tempfile.TemporaryDirectory() as td:
-            tmp = Path(td)
-            home = tmp / "home"
-            export_dir = home / "esp" / "esp-idf"
-            export_dir.mkdir(parents=True, exist_ok=True)
-            (export_dir / "export.sh").write_text(
-                "export IDF_PATH=\"$HOME/esp/esp-idf\"\n",
-                encoding="utf-8",
-            )
-
-            env = os.environ.copy()
-            env["HOME"] = str(home)
-            env["PATH"] = "/usr/bin:/bin:/usr/sbin:/sbin"
-            env["TERM"] = "dumb"
-
-            cmd = [
-                str(PROVISION_SH),
+        return self._run_provision(
+            [
                 "--yes",
                 "--skip-api-check",
                 "--port",
                 "/dev/null",
                 "--ssid",
-                ssid,
+                "TestNet",
                 "--pass",
-                wifi_pass,
+                "password123",
                 "--backend",
-                "openai",
-                "--api-key",
-                "sk-test",
+                "ollama",
             ]
-            if tg_chat_ids is not None:
-                cmd.extend(["--tg-chat-id", tg_chat_ids])
+        )
 
-            return subprocess.run(
-                cmd,
-                cwd=PROJECT_ROOT,
-                env=env,
-                text=True,
-                capture_output=True,
-                check=False,
-            )
+    def _run_provision_length_validation(
+        self,
+        *,
+        ssid: str,
+        wifi_pass: str,
+        tg_chat_ids: str | None = None,
+    ) -> subprocess.CompletedProcess[str]:
+        args = [
+            "--yes",
+            "--skip-api-check",
+            "--port",
+            "/dev/null",
+            "--ssid",
+            ssid,
+            "--pass",
+            wifi_pass,
+            "--backend",
+            "openai",
+            "--api-key",
+            "sk-test",
+        ]
+        if tg_chat_ids is not None:
+            args.extend(["--tg-chat-id", tg_chat_ids])
+        return self._run_provision(args)
 
     def _run_provision_capture_csv(
         self,
@@ -820,40 +752,12 @@ LAST_PORT=
     ) -> tuple[subprocess.CompletedProcess[str], str]:
         with tempfile.TemporaryDirectory() as td:
             tmp = Path(td)
-            home = tmp / "home"
-            idf_dir = home / "esp" / "esp-idf"
-            nvs_gen = idf_dir / "components" / "nvs_flash" / "nvs_partition_generator" / "nvs_partition_gen.py"
-            parttool = idf_dir / "components" / "partition_table" / "parttool.py"
-            nvs_gen.parent.mkdir(parents=True, exist_ok=True)
-            parttool.parent.mkdir(parents=True, exist_ok=True)
-            nvs_gen.write_text("# nvs generator stub path\n", encoding="utf-8")
-            parttool.write_text("# parttool stub path\n", encoding="utf-8")
-            (idf_dir / "export.sh").write_text(
-                "export IDF_PATH=\"$HOME/esp/esp-idf\"\n",
-                encoding="utf-8",
-            )
-
             bin_dir = tmp / "bin"
             bin_dir.mkdir(parents=True, exist_ok=True)
-            _write_executable(
-                bin_dir / "python",
-                "#!/bin/sh\n"
-                "if [ \"$2\" = \"generate\" ]; then\n"
-                "  cp \"$3\" \"$CSV_CAPTURE\"\n"
-                "  : > \"$4\"\n"
-                "  exit 0\n"
-                "fi\n"
-                "exit 0\n",
-            )
+            _write_executable(bin_dir / "python", _NVS_GEN_CAPTURE_CSV)
+            captured_csv_path = tmp / "captured-nvs.csv"
 
-            env = os.environ.copy()
-            env["HOME"] = str(home)
-            env["PATH"] = f"{bin_dir}:/usr/bin:/bin:/usr/sbin:/sbin"
-            env["TERM"] = "dumb"
-            env["CSV_CAPTURE"] = str(tmp / "captured-nvs.csv")
-
-            cmd = [
-                str(PROVISION_SH),
+            args = [
                 "--skip-api-check",
                 "--port",
                 "/dev/null",
@@ -865,23 +769,20 @@ LAST_PORT=
                 backend,
             ]
             if api_key is not None:
-                cmd.extend(["--api-key", api_key])
+                args.extend(["--api-key", api_key])
             if api_url is not None:
-                cmd.extend(["--api-url", api_url])
+                args.extend(["--api-url", api_url])
             if assume_yes:
-                cmd.insert(1, "--yes")
+                args.insert(0, "--yes")
 
-            proc = subprocess.run(
-                cmd,
-                cwd=PROJECT_ROOT,
-                env=env,
-                text=True,
-                input=input_text,
-                capture_output=True,
-                check=False,
+            proc = self._run_provision(
+                args,
+                bin_dir=bin_dir,
+                extra_env={"CSV_CAPTURE": str(captured_csv_path)},
+                input_text=input_text,
             )
 
-            captured_csv = (tmp / "captured-nvs.csv").read_text(encoding="utf-8") if (tmp / "captured-nvs.csv").exists() else ""
+            captured_csv = captured_csv_path.read_text(encoding="utf-8") if captured_csv_path.exists() else ""
             return proc, captured_csv
 
     def test_provision_openai_api_check_runs_in_yes_mode(self) -> None:
@@ -1031,44 +932,14 @@ LAST_PORT=
 
     def test_provision_writes_chat_id_allowlist_and_legacy_primary_key(self) -> None:
         with tempfile.TemporaryDirectory() as td:
-            tmp = Path(td)
-            home = tmp / "home"
-            idf_dir = home / "esp" / "esp-idf"
-            nvs_gen = idf_dir / "components" / "nvs_flash" / "nvs_partition_generator" / "nvs_partition_gen.py"
-            parttool = idf_dir / "components" / "partition_table" / "parttool.py"
-            nvs_gen.parent.mkdir(parents=True, exist_ok=True)
-            parttool.parent.mkdir(parents=True, exist_ok=True)
-            nvs_gen.write_text("# nvs generator stub path\n", encoding="utf-8")
-            parttool.write_text("# parttool stub path\n", encoding="utf-8")
-            (idf_dir / "export.sh").write_text(
-                "export IDF_PATH=\"$HOME/esp/esp-idf\"\n",
-                encoding="utf-8",
-            )
-
-            bin_dir = tmp / "bin"
-            bin_dir.mkdir(parents=True, exist_ok=True)
-            _write_executable(
-                bin_dir / "python",
-                "#!/bin/sh\n"
-                "if [ \"$2\" = \"generate\" ]; then\n"
-                "  cp \"$3\" \"$CSV_CAPTURE\"\n"
-                "  : > \"$4\"\n"
-                "  exit 0\n"
-                "fi\n"
-                "exit 0\n",
-            )
+            csv_path = Path(td) / "nvs.csv"
 
-            env = os.environ.copy()
-            env["HOME"] = str(home)
-            env["PATH"] = f"{bin_dir}:/usr/bin:/bin:/usr/sbin:/sbin"
-            env["TERM"] = "dumb"
-            env["CSV_CAPTURE"] = str(tmp / "captured-nvs.csv")
-
-            proc = subprocess.run(
+            proc = self._run_provision(
                 [
-                    str(PROVISION_SH),
                     "--yes",
                     "--skip-api-check",
+                    "--write-nvs-csv",
+                    str(csv_path),
                     "--port",
                     "/dev/null",
                     "--ssid",
@@ -1083,62 +954,28 @@ LAST_PORT=
                     "123456789:abcdef",
                     "--tg-chat-id",
                     "7585013353,-100222333444",
-                ],
-                cwd=PROJECT_ROOT,
-                env=env,
-                text=True,
-                capture_output=True,
-                check=False,
+                ]
             )
 
             output = f"{proc.stdout}\n{proc.stderr}"
             self.assertEqual(proc.returncode, 0, msg=output)
 
-            captured_csv = (tmp / "captured-nvs.csv").read_text(encoding="utf-8")
+            self.assertEqual(csv_path.stat().st_mode & 0o777, 0o600)
+            captured_csv = csv_path.read_text(encoding="utf-8")
             self.assertIn('llm_model,data,string,"gpt-5.4"', captured_csv)
             self.assertIn('tg_chat_id,data,string,"7585013353"', captured_csv)
             self.assertIn('tg_chat_ids,data,string,"7585013353,-100222333444"', captured_csv)
 
     def test_provision_ollama_writes_normalized_api_url_without_api_key(self) -> None:
         with tempfile.TemporaryDirectory() as td:
-            tmp = Path(td)
-            home = tmp / "home"
-            idf_dir = home / "esp" / "esp-idf"
-            nvs_gen = idf_dir / "components" / "nvs_flash" / "nvs_partition_generator" / "nvs_partition_gen.py"
-            parttool = idf_dir / "components" / "partition_table" / "parttool.py"
-            nvs_gen.parent.mkdir(parents=True, exist_ok=True)
-            parttool.parent.mkdir(parents=True, exist_ok=True)
-            nvs_gen.write_text("# nvs generator stub path\n", encoding="utf-8")
-            parttool.write_text("# parttool stub path\n", encoding="utf-8")
-            (idf_dir / "export.sh").write_text(
-                "export IDF_PATH=\"$HOME/esp/esp-idf\"\n",
-                encoding="utf-8",
-            )
-
-            bin_dir = tmp / "bin"
-            bin_dir.mkdir(parents=True, exist_ok=True)
-            _write_executable(
-                bin_dir / "python",
-                "#!/bin/sh\n"
-                "if [ \"$2\" = \"generate\" ]; then\n"
-                "  cp \"$3\" \"$CSV_CAPTURE\"\n"
-                "  : > \"$4\"\n"
-                "  exit 0\n"
-                "fi\n"
-                "exit 0\n",
-            )
+            csv_path = Path(td) / "nvs.csv"
 
-            env = os.environ.copy()
-            env["HOME"] = str(home)
-            env["PATH"] = f"{bin_dir}:/usr/bin:/bin:/usr/sbin:/sbin"
-            env["TERM"] = "dumb"
-            env["CSV_CAPTURE"] = str(tmp / "captured-nvs.csv")
-
-            proc = subprocess.run(
+            proc = self._run_provision(
                 [
-                    str(PROVISION_SH),
                     "--yes",
                     "--skip-api-check",
+                    "--write-nvs-csv",
+                    str(csv_path),
                     "--port",
                     "/dev/null",
                     "--ssid",
@@ -1149,18 +986,13 @@ LAST_PORT=
                     "ollama",
                     "--api-url",
                     "http://192.168.1.10:11434",
-                ],
-                cwd=PROJECT_ROOT,
-                env=env,
-                text=True,
-                capture_output=True,
-                check=False,
+                ]
             )
 
             output = f"{proc.stdout}\n{proc.stderr}"
             self.assertEqual(proc.returncode, 0, msg=output)
 
-            captured_csv = (tmp / "captured-nvs.csv").read_text(encoding="utf-8")
+            captured_csv = csv_path.read_text(encoding="utf-8")
             self.assertIn('llm_backend,data,string,"ollama"', captured_csv)
             self.assertIn('api_key,data,string,""', captured_csv)
             self.assertIn(
@@ -1185,32 +1017,33 @@ LAST_PORT=
         self.assertNotEqual(proc.returncode, 0, msg=output)
         self.assertIn("choose one of --nvs or --all", output)
 
+    def _build_erase_env(
+        self,
+        tmp: Path,
+        *,
+        stub_python3: bool = False,
+        stub_idf: bool = False,
+    ) -> tuple[dict[str, str], Path]:
+        fake_port = self.fake_port
+
+        bin_dir = tmp / "bin"
+        bin_dir.mkdir(parents=True, exist_ok=True)
+        if stub_python3:
+            _write_executable(bin_dir / "python3", _DUMP_ERASE_ARGS)
+        if stub_idf:
+            _write_executable(bin_dir / "idf.py", _DUMP_ERASE_ARGS)
+
+        env = dict(self._base_env)
+        env["HOME"] = str(self.fake_idf_home)
+        env["PATH"] = f"{bin_dir}:{self.stub_bin_dir}:/usr/bin:/bin"
+        env["TERM"] = "dumb"
+        env["ERASE_ARGS_FILE"] = str(tmp / "erase-args.txt")
+        return env, fake_port
+
     def test_erase_all_requires_yes_in_non_interactive_shell(self) -> None:
         with tempfile.TemporaryDirectory() as td:
             tmp = Path(td)
-            fake_port = tmp / "ttyUSB0"
-            fake_port.touch()
-
-            home = tmp / "home"
-            export_dir = home / "esp" / "esp-idf"
-            export_dir.mkdir(parents=True, exist_ok=True)
-            (export_dir / "export.sh").write_text(
-                "export IDF_PATH=\"$HOME/esp/esp-idf\"\n",
-                encoding="utf-8",
-            )
-
-            bin_dir = tmp / "bin"
-            bin_dir.mkdir(parents=True, exist_ok=True)
-            _write_executable(
-                bin_dir / "lsof",
-                "#!/bin/sh\n"
-                "exit 1\n",
-            )
-
-            env = os.environ.copy()
-            env["HOME"] = str(home)
-            env["PATH"] = f"{bin_dir}:/usr/bin:/bin:/usr/sbin:/sbin"
-            env["TERM"] = "dumb"
+            env, fake_port = self._build_erase_env(tmp)
 
             proc = subprocess.run(
                 [
@@ -1233,37 +1066,7 @@ LAST_PORT=
     def test_erase_nvs_yes_executes_parttool_erase_partition(self) -> None:
         with tempfile.TemporaryDirectory() as td:
             tmp = Path(td)
-            fake_port = tmp / "ttyUSB0"
-            fake_port.touch()
-
-            home = tmp / "home"
-            idf_dir = home / "esp" / "esp-idf"
-            parttool = idf_dir / "components" / "partition_table" / "parttool.py"
-            parttool.parent.mkdir(parents=True, exist_ok=True)
-            parttool.write_text("# parttool stub path\n", encoding="utf-8")
-            (idf_dir / "export.sh").write_text(
-                "export IDF_PATH=\"$HOME/esp/esp-idf\"\n",
-                encoding="utf-8",
-            )
-
-            bin_dir = tmp / "bin"
-            bin_dir.mkdir(parents=True, exist_ok=True)
-            _write_executable(
-                bin_dir / "python3",
-                "#!/bin/sh\n"
-                "printf '%s\\n' \"$@\" > \"$ERASE_ARGS_FILE\"\n",
-            )
-            _write_executable(
-                bin_dir / "lsof",
-                "#!/bin/sh\n"
-                "exit 1\n",
-            )
-
-            env = os.environ.copy()
-            env["HOME"] = str(home)
-            env["PATH"] = f"{bin_dir}:/usr/bin:/bin"
-            env["TERM"] = "dumb"
-            env["ERASE_ARGS_FILE"] = str(tmp / "erase-args.txt")
+            env, fake_port = self._build_erase_env(tmp, stub_python3=True)
 
             proc = subprocess.run(
                 [
@@ -1291,35 +1094,7 @@ LAST_PORT=
     def test_erase_all_yes_executes_idf_erase_flash(self) -> None:
         with tempfile.TemporaryDirectory() as td:
             tmp = Path(td)
-            fake_port = tmp / "ttyUSB0"
-            fake_port.touch()
-
-            home = tmp / "home"
-            export_dir = home / "esp" / "esp-idf"
-            export_dir.mkdir(parents=True, exist_ok=True)
-            (export_dir / "export.sh").write_text(
-                "export IDF_PATH=\"$HOME/esp/esp-idf\"\n",
-                encoding="utf-8",
-            )
-
-            bin_dir = tmp / "bin"
-            bin_dir.mkdir(parents=True, exist_ok=True)
-            _write_executable(
-                bin_dir / "idf.py",
-                "#!/bin/sh\n"
-                "printf '%s\\n' \"$@\" > \"$ERASE_ARGS_FILE\"\n",
-            )
-            _write_executable(
-                bin_dir / "lsof",
-                "#!/bin/sh\n"
-                "exit 1\n",
-            )
-
-            env = os.environ.copy()
-            env["HOME"] = str(home)
-            env["PATH"] = f"{bin_dir}:/usr/bin:/bin"
-            env["TERM"] = "dumb"
-            env["ERASE_ARGS_FILE"] = str(tmp / "erase-args.txt")
+            env, fake_port = self._build_erase_env(tmp, stub_idf=True)
 
             proc = subprocess.run(
                 [
@@ -1344,6 +1119,31 @@ LAST_PORT=
         self.assertIn(str(fake_port), args_text)
         self.assertIn("erase-flash", args_text)
 
+    def test_erase_all_dry_run_prints_command_without_running_idf(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            env, fake_port = self._build_erase_env(tmp)
+
+            proc = subprocess.run(
+                [
+                    str(ERASE_SH),
+                    "--all",
+                    "--dry-run",
+                    "--port",
+                    str(fake_port),
+                ],
+                cwd=PROJECT_ROOT,
+                env=env,
+                text=True,
+                capture_output=True,
+                check=False,
+            )
+
+        output = f"{proc.stdout}\n{proc.stderr}"
+        self.assertEqual(proc.returncode, 0, msg=output)
+        self.assertIn(f"Command: idf.py -p {fake_port} erase-flash", output)
+        self.assertIn("Dry run only; erase command not executed.", output)
+
     def test_provision_dev_write_template_creates_profile(self) -> None:
         with tempfile.TemporaryDirectory() as td:
             tmp = Path(td)
@@ -1376,11 +1176,7 @@ LAST_PORT=
             args_file = tmp / "args.txt"
             stub = tmp / "mock-provision.sh"
 
-            _write_executable(
-                stub,
-                "#!/bin/sh\n"
-                "printf '%s\\n' \"$@\" > \"$ARGS_FILE\"\n",
-            )
+            _write_executable(stub, _DUMP_PROVISION_ARGS)
             env_file.write_text(
                 "\n".join(
                     [
@@ -1398,7 +1194,7 @@ LAST_PORT=
                 encoding="utf-8",
             )
 
-            env = os.environ.copy()
+            env = dict(self._base_env)
             env["ARGS_FILE"] = str(args_file)
             env["ZCLAW_PROVISION_SCRIPT"] = str(stub)
 
@@ -1438,11 +1234,7 @@ LAST_PORT=
             args_file = tmp / "args.txt"
             stub = tmp / "mock-provision.sh"
 
-            _write_executable(
-                stub,
-                "#!/bin/sh\n"
-                "printf '%s\\n' \"$@\" > \"$ARGS_FILE\"\n",
-            )
+            _write_executable(stub, _DUMP_PROVISION_ARGS)
             env_file.write_text(
                 "\n".join(
                     [
@@ -1454,7 +1246,7 @@ LAST_PORT=
                 encoding="utf-8",
             )
 
-            env = os.environ.copy()
+            env = dict(self._base_env)
             env["ARGS_FILE"] = str(args_file)
             env["ZCLAW_PROVISION_SCRIPT"] = str(stub)
             env["OPENROUTER_API_KEY"] = "or-sk-test-xyz"
@@ -1487,11 +1279,7 @@ LAST_PORT=
             args_file = tmp / "args.txt"
             stub = tmp / "mock-provision.sh"
 
-            _write_executable(
-                stub,
-                "#!/bin/sh\n"
-                "printf '%s\\n' \"$@\" > \"$ARGS_FILE\"\n",
-            )
+            _write_executable(stub, _DUMP_PROVISION_ARGS)
             env_file.write_text(
                 "\n".join(
                     [
@@ -1506,7 +1294,7 @@ LAST_PORT=
                 encoding="utf-8",
             )
 
-            env = os.environ.copy()
+            env = dict(self._base_env)
             env["ARGS_FILE"] = str(args_file)
             env["ZCLAW_PROVISION_SCRIPT"] = str(stub)
 
@@ -1546,11 +1334,7 @@ LAST_PORT=
                 encoding="utf-8",
             )
 
-            env = os.environ.copy()
-            env.pop("OPENAI_API_KEY", None)
-            env.pop("ANTHROPIC_API_KEY", None)
-            env.pop("OPENROUTER_API_KEY", None)
-            env.pop("ZCLAW_API_KEY", None)
+            env = dict(self._base_env)
 
             proc = subprocess.run(
                 [
@@ -1584,7 +1368,7 @@ LAST_PORT=
                 encoding="utf-8",
             )
 
-            env = os.environ.copy()
+            env = dict(self._base_env)
 
             proc = subprocess.run(
                 [
@@ -1610,11 +1394,7 @@ LAST_PORT=
             args_file = tmp / "args.txt"
             stub = tmp / "mock-provision.sh"
 
-            _write_executable(
-                stub,
-                "#!/bin/sh\n"
-                "printf '%s\\n' \"$@\" > \"$ARGS_FILE\"\n",
-            )
+            _write_executable(stub, _DUMP_PROVISION_ARGS)
             env_file.write_text(
                 "\n".join(
                     [
@@ -1627,7 +1407,7 @@ LAST_PORT=
                 encoding="utf-8",
             )
 
-            env = os.environ.copy()
+            env = dict(self._base_env)
             env["ARGS_FILE"] = str(args_file)
             env["ZCLAW_PROVISION_SCRIPT"] = str(stub)
 
@@ -1662,8 +1442,7 @@ LAST_PORT=
             env_file = tmp / "dev.env"
             env_file.write_text("# no token\n", encoding="utf-8")
 
-            env = os.environ.copy()
-            env.pop("ZCLAW_TG_TOKEN", None)
+            env = dict(self._base_env)
 
             proc = subprocess.run(
                 [
@@ -1710,14 +1489,14 @@ LAST_PORT=
                 "done\n"
                 "printf '%s\\n' \"$url\" >> \"$CURL_URLS_FILE\"\n"
                 "code='200'\n"
-                "if echo \"$url\" | grep -q 'offset=-1'; then\n"
-                "  body='{\"ok\":true,\"result\":[{\"update_id\":4242}]}'\n"
-                "elif echo \"$url\" | grep -q 'offset=4243'; then\n"
-                "  body='{\"ok\":true,\"result\":[]}'\n"
-                "else\n"
-                "  code='400'\n"
-                "  body='{\"ok\":false,\"error_code\":400,\"description\":\"bad offset\"}'\n"
-                "fi\n"
+                "case \"$url\" in\n"
+                "  *offset=-1*) body='{\"ok\":true,\"result\":[{\"update_id\":4242}]}' ;;\n"
+                "  *offset=4243*) body='{\"ok\":true,\"result\":[]}' ;;\n"
+                "  *)\n"
+                "    code='400'\n"
+                "    body='{\"ok\":false,\"error_code\":400,\"description\":\"bad offset\"}'\n"
+                "    ;;\n"
+                "esac\n"
                 "if [ -n \"$out\" ]; then\n"
                 "  printf '%s' \"$body\" > \"$out\"\n"
                 "fi\n"
@@ -1728,10 +1507,9 @@ LAST_PORT=
                 "fi\n",
             )
 
-            env = os.environ.copy()
+            env = dict(self._base_env)
             env["PATH"] = f"{bin_dir}:/usr/bin:/bin"
             env["CURL_URLS_FILE"] = str(tmp / "urls.txt")
-            env.pop("ZCLAW_TG_TOKEN", None)
 
             proc = subprocess.run(
                 [
@@ -11,7 +11,9 @@ from pathlib import Path
 
 TEST_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = TEST_DIR.parent.parent
-sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+SCRIPTS_DIR = str(PROJECT_ROOT / "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
 
 from qemu_live_llm_bridge import (
     build_error_payload,
@@ -3,17 +3,28 @@
 
 from __future__ import annotations
 
+import http.client
+import logging
 import sys
+import tempfile
+import threading
+import time
 import unittest
 from pathlib import Path
 
 
 TEST_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = TEST_DIR.parent.parent
-sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+SCRIPTS_DIR = str(PROJECT_ROOT / "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
 
 from web_relay import (  # noqa: E402
+    MAX_CHAT_BODY_BYTES,
+    AppState,
+    BufferedLogFileHandler,
     MockAgentBridge,
+    RelayHTTPServer,
     SerialAgentBridge,
     canonical_origin,
     create_agent_bridge,
@@ -25,6 +36,7 @@ from web_relay import (  # noqa: E402
     is_probable_serial_exception,
     is_probable_esp_log_line,
     is_request_authorized,
+    make_handler,
     normalize_api_key,
     normalize_origin,
     resolve_serial_port,
@@ -183,6 +195,8 @@ class WebRelayTests(unittest.TestCase):
                 return
 
             def read(self, size: int) -> bytes:
+                if self.lines:
+                    return self.lines.pop(0)
                 return b""
 
             def write(self, payload: bytes) -> int:
@@ -192,11 +206,6 @@ class WebRelayTests(unittest.TestCase):
             def flush(self) -> None:
                 return
 
-            def readline(self) -> bytes:
-                if self.lines:
-                    return self.lines.pop(0)
-                return b""
-
         bridge = SerialAgentBridge(
             port="/dev/cu.usbmodem1101",
             baudrate=115200,
@@ -212,6 +221,33 @@ class WebRelayTests(unittest.TestCase):
         self.assertEqual(reply, "Hi there")
         self.assertEqual(fake.writes, [b"hello\n"])
 
+    def test_serial_bridge_readline_splits_chunks_and_compacts(self) -> None:
+        class ChunkSerial:
+            def __init__(self, chunks: list[bytes]) -> None:
+                self.chunks = chunks
+
+            def read(self, size: int) -> bytes:
+                if self.chunks:
+                    return self.chunks.pop(0)
+                return b""
+
+        bridge = SerialAgentBridge(
+            port="/dev/cu.usbmodem1101",
+            baudrate=115200,
+            serial_timeout_s=0.05,
+            response_timeout_s=0.2,
+            idle_timeout_s=0.02,
+            log_serial=False,
+        )
+        bridge._rxbuf = bytearray(16)
+        bridge._serial = ChunkSerial([b"one\ntw", b"o\nthree-is-long\n", b"tail"])
+
+        self.assertEqual(bridge._readline(), b"one\n")
+        self.assertEqual(bridge._readline(), b"two\n")
+        self.assertEqual(bridge._readline(), b"three-is-long\n")
+        self.assertEqual(bridge._readline(), b"tail")
+        self.assertEqual(bridge._readline(), b"")
+
     def test_mock_bridge_commands(self) -> None:
         bridge = MockAgentBridge(latency_s=0.0)
         self.assertEqual(bridge.ask("ping"), "pong")
@@ -233,6 +269,102 @@ class WebRelayTests(unittest.TestCase):
         self.assertIsInstance(bridge, MockAgentBridge)
         self.assertEqual(target, "mock-agent")
 
+    def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        cors_origin: str | None = None,
+        headers: dict[str, str] | None = None,
+        body: bytes | None = None,
+    ) -> tuple[http.client.HTTPResponse, bytes]:
+        state = AppState(
+            bridge=MockAgentBridge(latency_s=0.0),
+            bridge_target="mock-agent",
+            api_key=None,
+            cors_origin=cors_origin,
+        )
+        httpd = RelayHTTPServer(("127.0.0.1", 0), make_handler(state))
+        # shutdown() waits for serve_forever's next poll; the 0.5s default
+        # dominated each request test.
+        thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+        thread.start()
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", httpd.server_address[1], timeout=3)
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            data = response.read()
+            conn.close()
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+        return response, data
+
+    def test_options_preflight_echoes_allowed_origin(self) -> None:
+        response, _ = self._request(
+            "OPTIONS",
+            "/api/chat",
+            cors_origin="https://app.example",
+            headers={"Origin": "https://app.example"},
+        )
+        self.assertEqual(response.status, 204)
+        self.assertEqual(response.getheader("Access-Control-Allow-Origin"), "https://app.example")
+        self.assertEqual(response.getheader("Access-Control-Allow-Methods"), "GET,POST,OPTIONS")
+        self.assertEqual(response.getheader("Cache-Control"), "no-store")
+        self.assertEqual(response.getheader("Vary"), "Origin")
+        self.assertIsNotNone(response.getheader("Date"))
+        self.assertTrue(response.getheader("Server", "").startswith("zclaw-web-relay/1.0"))
+
+    def test_chat_post_round_trip(self) -> None:
+        response, data = self._request(
+            "POST",
+            "/api/chat",
+            headers={"Content-Type": "application/json"},
+            body=b'{"message":"ping"}',
+        )
+        self.assertEqual(response.status, 200, msg=data)
+        self.assertIn(b'"reply":"pong"', data)
+
+    def test_chat_post_rejects_oversized_body(self) -> None:
+        response, data = self._request(
+            "POST",
+            "/api/chat",
+            headers={
+                "Content-Type": "application/json",
+                "Content-Length": str(MAX_CHAT_BODY_BYTES + 1),
+            },
+        )
+        self.assertEqual(response.status, 400)
+        self.assertIn(b"Invalid body size", data)
+
+    def test_buffered_log_file_handler_flushes_on_error(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            log_path = Path(td) / "relay.log"
+            handler = BufferedLogFileHandler(str(log_path), encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+            try:
+                handler.handle(logging.makeLogRecord({"msg": "queued", "levelno": logging.INFO, "levelname": "INFO"}))
+                self.assertEqual(log_path.read_text(encoding="utf-8"), "")
+
+                handler.handle(logging.makeLogRecord({"msg": "boom", "levelno": logging.ERROR, "levelname": "ERROR"}))
+                self.assertEqual(log_path.read_text(encoding="utf-8"), "INFO queued\nERROR boom\n")
+            finally:
+                handler.close()
+
+    def test_buffered_log_file_handler_periodic_flush(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            log_path = Path(td) / "relay.log"
+            handler = BufferedLogFileHandler(str(log_path), encoding="utf-8")
+            try:
+                handler.handle(logging.makeLogRecord({"msg": "tick", "levelno": logging.INFO}))
+                handler.start_periodic_flush(0.01)
+                deadline = time.monotonic() + 2.0
+                while not log_path.read_text(encoding="utf-8") and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                self.assertEqual(log_path.read_text(encoding="utf-8"), "tick\n")
+            finally:
+                handler.close()
+
     def test_resolve_serial_port_returns_explicit(self) -> None:
         self.assertEqual(resolve_serial_port("/dev/ttyTEST0"), "/dev/ttyTEST0")
 